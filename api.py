@@ -1,13 +1,41 @@
-from fastapi import FastAPI, Depends, Request
+import os
+import json
+import base64
+import hashlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, astuple, asdict
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, tuple_
 from sqlalchemy.future import select
 from pydantic import BaseModel
-from datetime import datetime
 
-from database.db import AsyncSessionLocal, Event as EventDB
+from database.crud import get_data_version
+from database.db import AsyncSessionLocal, Event as EventDB, EventDailyStat, CrawlRun, Venue, engine, init_db
+from database.read_model import READ_MODEL
+from database.snapshot import SNAPSHOT
 from fastapi.middleware.cors import CORSMiddleware
+from utils.ical import calendar_header, calendar_footer, render_vevent
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Make sure the ledger / venue tables exist even before the first crawl
+    await init_db()
+    # In-memory copy of music_events kept fresh via LISTEN/NOTIFY (Postgres only)
+    READ_MODEL.start()
+    # Edge instances (API_SNAPSHOT_PATH) follow the snapshots the crawler publishes
+    SNAPSHOT.start()
+    yield
+    await SNAPSHOT.stop()
+    await READ_MODEL.stop()
+    # aiosqlite's connection threads would otherwise keep the process alive after shutdown
+    await engine.dispose()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Allowed origins for dynamic CORS
 ALLOWED_ORIGINS = {
@@ -75,12 +103,261 @@ class EventSchema(BaseModel):
     detailsUrl: str | None
     sourceName: str
     sourceUrl: str
+    venue_id: int | None = None
+    price: str | None = None  # filled by detail-page enrichment
+    genres: str | None = None
 
     class Config:
         orm_mode = True  # allows Pydantic to work directly with ORM objects
 
+
+class VenueSchema(BaseModel):
+    id: int
+    name: str
+
+    class Config:
+        orm_mode = True
+
+@dataclass(frozen=True)
+class EventFilters:
+    """Query filters shared by /events and /events.ics."""
+    source: str | None = None
+    venue: int | None = None
+    start: datetime | None = None
+    end: datetime | None = None
+
+    def apply(self, query):
+        query = query.where(EventDB.deleted_at.is_(None))
+        if self.source:
+            query = query.where(EventDB.sourceName == self.source)
+        if self.venue is not None:
+            query = query.where(EventDB.venue_id == self.venue)
+        # A start_date range lets Postgres prune to the matching monthly partitions
+        if self.start:
+            query = query.where(EventDB.start_date >= self.start)
+        if self.end:
+            query = query.where(EventDB.start_date < self.end)
+        return query
+
 @app.get("/events", response_model=list[EventSchema])
-async def get_events(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(EventDB))
+async def get_events(filters: EventFilters = Depends(), db: AsyncSession = Depends(get_db)):
+    if READ_MODEL.ready:
+        return READ_MODEL.query(**asdict(filters))
+    result = await db.execute(filters.apply(select(EventDB)))
     events = result.scalars().all()
     return events
+
+
+# Rows are only handed out once they are this old, so a crawler batch still
+# committing with an older updated_at can't slip behind a client's token
+CHANGES_SETTLE_SECONDS = int(os.getenv("CHANGES_SETTLE_SECONDS", "30"))
+
+
+class EventChangeSchema(EventSchema):
+    updated_at: datetime
+
+
+class EventChangesSchema(BaseModel):
+    token: str           # pass back as ?since= on the next call
+    has_more: bool       # more changes are waiting; call again right away
+    events: list[EventChangeSchema]  # inserted or updated since the token
+    deleted: list[int]   # ids removed since the token
+
+
+def encode_change_token(updated_at: datetime, event_id: int) -> str:
+    raw = json.dumps([updated_at.isoformat(), event_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_change_token(token: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        updated_at, event_id = json.loads(raw)
+        return datetime.fromisoformat(updated_at), int(event_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+
+@app.get("/events/changes", response_model=EventChangesSchema)
+async def get_event_changes(
+    since: str | None = None,
+    limit: int = Query(1000, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Events inserted, updated or soft-deleted after `since` (the token of the
+    previous call), ordered by (updated_at, id) and served by idx_updated_at.
+    Without a token the current events are returned, to seed a client.
+    """
+    query = select(EventDB).where(
+        EventDB.updated_at <= datetime.now() - timedelta(seconds=CHANGES_SETTLE_SECONDS)
+    )
+    if since:
+        query = query.where(tuple_(EventDB.updated_at, EventDB.id) > tuple_(*decode_change_token(since)))
+    else:
+        query = query.where(EventDB.deleted_at.is_(None))
+    result = await db.execute(query.order_by(EventDB.updated_at, EventDB.id).limit(limit + 1))
+    rows = result.scalars().all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        token = encode_change_token(rows[-1].updated_at, rows[-1].id)
+    else:
+        token = since or encode_change_token(datetime.min, 0)
+    return {
+        "token": token,
+        "has_more": has_more,
+        "events": [row for row in rows if row.deleted_at is None],
+        "deleted": [row.id for row in rows if row.deleted_at is not None],
+    }
+
+
+class EventStatsSchema(BaseModel):
+    days: dict[date, int]
+    sources: dict[str, int]
+    locations: dict[str, int]
+
+@app.get("/events/stats", response_model=EventStatsSchema)
+async def get_event_stats(
+    start: date | None = None,
+    end: date | None = None,
+    source: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Event counts per day, source and location, read from the precomputed event_daily_stats."""
+    conditions = []
+    if start:
+        conditions.append(EventDailyStat.day >= start)
+    if end:
+        conditions.append(EventDailyStat.day < end)
+    if source:
+        conditions.append(EventDailyStat.source == source)
+
+    async def counts(column):
+        result = await db.execute(
+            select(column, func.sum(EventDailyStat.events)).where(*conditions).group_by(column).order_by(column)
+        )
+        return {key: int(total) for key, total in result.all()}
+
+    return {
+        "days": await counts(EventDailyStat.day),
+        "sources": await counts(EventDailyStat.source),
+        "locations": await counts(EventDailyStat.location),
+    }
+
+
+# Rendered feeds by filter key: (data version, body). Calendar clients poll the
+# same few URLs, so a small LRU covers them; a committed crawl or enrichment bumps the version.
+ICS_CACHE: OrderedDict[EventFilters, tuple[tuple, bytes]] = OrderedDict()
+ICS_CACHE_SIZE = 128
+ICS_MEDIA_TYPE = "text/calendar; charset=utf-8"
+
+def ics_etag(filters: EventFilters, version: tuple) -> str:
+    digest = hashlib.sha1(repr((astuple(filters), version)).encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+async def stream_ics(filters: EventFilters, version: tuple):
+    """Stream VEVENTs straight from the DB cursor and keep the result for the cache."""
+    chunks = [calendar_header().encode()]
+    yield chunks[0]
+    dtstamp = datetime.now(timezone.utc)
+    query = filters.apply(select(EventDB).where(EventDB.start_date.is_not(None))).order_by(EventDB.start_date)
+    async with AsyncSessionLocal() as session:
+        result = await session.stream_scalars(query.execution_options(yield_per=500))
+        async for event in result:
+            chunk = render_vevent(event, dtstamp).encode()
+            chunks.append(chunk)
+            yield chunk
+    chunks.append(calendar_footer().encode())
+    yield chunks[-1]
+
+    ICS_CACHE[filters] = (version, b"".join(chunks))
+    ICS_CACHE.move_to_end(filters)
+    while len(ICS_CACHE) > ICS_CACHE_SIZE:
+        ICS_CACHE.popitem(last=False)
+
+@app.get("/events.ics")
+async def get_events_ics(request: Request, filters: EventFilters = Depends(), db: AsyncSession = Depends(get_db)):
+    version = await get_data_version(db)
+    etag = ics_etag(filters, version)
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=300"}
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    cached = ICS_CACHE.get(filters)
+    if cached and cached[0] == version:
+        ICS_CACHE.move_to_end(filters)
+        return Response(content=cached[1], media_type=ICS_MEDIA_TYPE, headers=headers)
+
+    return StreamingResponse(stream_ics(filters, version), media_type=ICS_MEDIA_TYPE, headers=headers)
+
+
+@app.get("/venues", response_model=list[VenueSchema])
+async def get_venues(db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(Venue).order_by(Venue.name))
+    return result.scalars().all()
+
+@app.get("/venues/{venue_id}/events", response_model=list[EventSchema])
+async def get_venue_events(
+    venue_id: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    # Served by the composite (venue_id, start_date) index
+    if await db.get(Venue, venue_id) is None:
+        raise HTTPException(status_code=404, detail="Venue not found")
+    if READ_MODEL.ready:
+        return READ_MODEL.query(venue=venue_id, start=start, end=end)
+    query = select(EventDB).where(EventDB.venue_id == venue_id, EventDB.deleted_at.is_(None))
+    if start:
+        query = query.where(EventDB.start_date >= start)
+    if end:
+        query = query.where(EventDB.start_date < end)
+    result = await db.execute(query.order_by(EventDB.start_date))
+    return result.scalars().all()
+
+
+class CrawlRunSourceSchema(BaseModel):
+    source: str
+    status: str
+    started_at: datetime
+    finished_at: datetime | None
+    fetch_seconds: float | None
+    extract_seconds: float | None
+    normalize_seconds: float | None
+    persist_seconds: float | None
+    pages: int | None
+    events: int | None
+    inserted: int | None
+    updated: int | None
+    unchanged: int | None
+    quarantined: int | None
+    dropped: int | None
+    swept: int | None
+    error_class: str | None
+    rss_start_kb: int | None
+    rss_end_kb: int | None
+
+    class Config:
+        orm_mode = True
+
+
+class CrawlRunSchema(BaseModel):
+    id: int
+    started_at: datetime
+    finished_at: datetime | None
+    status: str
+    peak_rss_kb: int | None
+    sources: list[CrawlRunSourceSchema]
+
+    class Config:
+        orm_mode = True
+
+@app.get("/crawl-runs", response_model=list[CrawlRunSchema])
+async def get_crawl_runs(limit: int = Query(20, ge=1, le=200), db: AsyncSession = Depends(get_db)):
+    """Most recent crawl runs with per-source stage timings, newest first."""
+    result = await db.execute(select(CrawlRun).order_by(CrawlRun.id.desc()).limit(limit))
+    return result.scalars().all()
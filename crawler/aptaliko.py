@@ -3,11 +3,14 @@ import json
 from datetime import datetime
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
-from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CacheMode
+from crawl4ai import CrawlerRunConfig, CacheMode
 from crawl4ai import JsonCssExtractionStrategy
 
 from utils.helper import LOGGER
+from utils.html import parse_document, has_class
+from utils.metrics import stage, count_dropped
+from utils.records import make_record
+from utils.replay import open_crawler
 
 BASE_URL = "https://aptaliko.gr/search?contentType=EVENTS&groupPage=1&eventPage="
 DOMAIN = "https://aptaliko.gr"
@@ -64,7 +67,7 @@ async def crawl_aptaliko():
     LOGGER.info("🌐 Crawling aptaliko.gr")
 
     page = 1
-    all_events = []
+    total = 0
 
     schema = {
         "name": "Aptaliko",
@@ -86,46 +89,56 @@ async def crawl_aptaliko():
         wait_for="css:a.mbz-card",
     )
 
-    async with AsyncWebCrawler(verbose=True) as crawler:
+    async with open_crawler(verbose=True) as crawler:
         while True:
             url = f"{BASE_URL}{page}"
             LOGGER.debug(f"Fetching page {page}: {url}")
 
             # Fetch event data
             result = await crawler.arun(url=url, config=config)
-            if not result.success:
-                LOGGER.error(f"❌ Crawl failed on page {page}: {result.error_message}")
-                break
 
             try:
-                page_data = json.loads(result.extracted_content)
+                with stage("extract"):
+                    page_data = json.loads(result.extracted_content)
             except json.JSONDecodeError as e:
-                LOGGER.error(f"❌ Failed to parse JSON on page {page}: {e}")
-                break
+                # Stopping here would look like the end of the listing
+                raise RuntimeError(f"Failed to parse JSON on page {page}: {e}") from e
 
             if not page_data or len(page_data) == 0:
                 LOGGER.info(f"No more events found on page {page}, stopping.")
                 break
 
-            for event in page_data:
-                # Fix relative URLs
-                for key in ["imageUrl", "detailsUrl"]:
-                    if event.get(key, "").startswith("/"):
-                        event[key] = urljoin(DOMAIN, event[key])
-
-                # Parse and normalize dates
-                parsed = parse_event_date(event.get("date", ""))
-                if parsed:
-                    event["start_date"] = parsed["start_date"]
-                    event["end_date"] = parsed["end_date"]
-                else:
-                    continue  # Skip invalid date
-                if "date" in event:
-                    event.pop("date", None)
-                event["sourceName"] = "aptaliko.gr"
-                event["sourceUrl"] = BASE_URL
-
-            all_events.extend(page_data)
+            records = []
+            with stage("normalize"):
+                for event in page_data:
+                    # Fix relative URLs
+                    for key in ["imageUrl", "detailsUrl"]:
+                        if event.get(key, "").startswith("/"):
+                            event[key] = urljoin(DOMAIN, event[key])
+
+                    # Parse and normalize dates
+                    parsed = parse_event_date(event.get("date", ""))
+                    if not parsed:
+                        count_dropped()
+                        continue  # Skip invalid date
+
+                    record = make_record(
+                        title=event.get("title"),
+                        start_date=parsed["start_date"],
+                        end_date=parsed["end_date"],
+                        location=event.get("location"),
+                        imageUrl=event.get("imageUrl"),
+                        detailsUrl=event.get("detailsUrl"),
+                        sourceName="aptaliko.gr",
+                        sourceUrl=BASE_URL,
+                    )
+                    if record:
+                        records.append(record)
+
+            # Hand the page to the writer before loading the next one
+            for record in records:
+                yield record
+            total += len(records)
 
             # Check if there's a next page
             html_result = await crawler.arun(
@@ -137,25 +150,20 @@ async def crawl_aptaliko():
                 ),
             )
 
-            if not html_result.success:
-                LOGGER.warning(f"⚠️ Failed to fetch pagination info on page {page}: {html_result.error_message}")
-                break
-
             # raw_content is bytes, decode to str
             raw_html = html_result.fit_html
-            soup = BeautifulSoup(raw_html, "html.parser")
-            next_btn = soup.select_one("button.o-pag__link.pagination-link.o-pag__next")
+            with stage("extract"):
+                buttons = parse_document(raw_html).cssselect("button.o-pag__link.pagination-link.o-pag__next")
 
-            if not next_btn:
-                LOGGER.info("No 'Next' button found, stopping crawl.")
-                break
+            if not buttons:
+                # The last page shows a disabled button; none at all means the page didn't render
+                raise RuntimeError(f"No 'Next' button found on page {page}")
 
-            classes = next_btn.get("class", [])
-            if "o-pag__link--disabled" in classes or "pagination-link-disabled" in classes:
+            next_btn = buttons[0]
+            if has_class(next_btn, "o-pag__link--disabled") or has_class(next_btn, "pagination-link-disabled"):
                 LOGGER.info("Next button is disabled, stopping crawl.")
                 break
 
             page += 1
 
-    LOGGER.info(f"✅ Completed crawling aptaliko.gr — {len(all_events)} events found")
-    return all_events
+    LOGGER.info(f"✅ Completed crawling aptaliko.gr — {total} events found")
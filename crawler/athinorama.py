@@ -1,22 +1,33 @@
+import os
 import re
 import json
-from datetime import datetime
+import asyncio
+from dataclasses import replace
+from datetime import date, datetime, timedelta
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
-from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CacheMode, JsonCssExtractionStrategy
+from crawl4ai import CrawlerRunConfig, CacheMode, JsonCssExtractionStrategy
 
-from utils.helper import LOGGER
+from utils.helper import LOGGER, nearest_year
+from utils.html import parse_fragment, parse_fragments, text_content
+from utils.metrics import stage, count_dropped
+from utils.records import PLACEHOLDER_TIME, EventRecord, make_record
+from utils.replay import open_crawler
 
-CURRENT_YEAR = datetime.now().year
 BASE_URL = "https://www.athinorama.gr/music/guide"
+# Guide page for a given day; {date} is formatted with DAY_URL_DATE_FORMAT
+DAY_URL_TEMPLATE = os.getenv("ATHINORAMA_DAY_URL", BASE_URL + "?date={date}")
+DAY_URL_DATE_FORMAT = os.getenv("ATHINORAMA_DAY_URL_DATE_FORMAT", "%d-%m-%Y")
+# How many days of the guide to crawl (starting today) and how many at once
+GUIDE_DAYS = int(os.getenv("ATHINORAMA_DAYS", "7"))
+GUIDE_CONCURRENCY = int(os.getenv("ATHINORAMA_CONCURRENCY", "3"))
 
 
 def convert_greek_time_to_24h(time_str: str) -> str:
     """Convert Greek AM/PM times into 24h format."""
     match = re.search(r"(\d{1,2})(?:[:\.](\d{2}))?\s*(π\.μ\.|μ\.μ\.)", time_str)
     if not match:
-        return "21:00"  # default fallback
+        return PLACEHOLDER_TIME.strftime("%H:%M")  # default fallback
 
     hour = int(match.group(1))
     minute = int(match.group(2) or 0)
@@ -30,38 +41,120 @@ def convert_greek_time_to_24h(time_str: str) -> str:
     return f"{hour:02}:{minute:02}"
 
 
-def parse_event_datetime(summary_html: str) -> tuple[datetime | None, datetime | None]:
-    """Extract datetime from Athinorama summary HTML."""
-    soup = BeautifulSoup(summary_html, "html.parser")
-    summary_with_date = soup.find("p", class_="summary", style=lambda s: s and "display:block" in s)
+# <p class="summary" style="...display:block..."> holding the date
+SUMMARY_XPATH = (
+    ".//p[contains(concat(' ', normalize-space(@class), ' '), ' summary ')"
+    " and contains(@style, 'display:block')]"
+)
+
 
-    if not summary_with_date:
-        LOGGER.warning(f"Missing styled summary with date in HTML: {summary_html[:80]}...")
+def parse_event_datetime(summary_html: str, reference: date | None = None) -> tuple[datetime | None, datetime | None]:
+    """Extract datetime from Athinorama summary HTML."""
+    return summary_datetime(parse_fragment(summary_html), reference)
+
+
+def summary_datetime(summary, reference: date | None = None) -> tuple[datetime | None, datetime | None]:
+    """
+    Extract datetime from a parsed Athinorama summary (see utils.html.parse_fragments).
+    The guide omits the year; it is taken to be the one closest to `reference`
+    (the guide day, today by default).
+    """
+    matches = summary.xpath(SUMMARY_XPATH)
+    if not matches:
+        LOGGER.warning(f"Missing styled summary with date in HTML: {text_content(summary, ' ')[:80]}...")
         return None, None
+    summary_with_date = matches[0]
 
-    strong_tag = summary_with_date.find("strong")
-    date_str = strong_tag.get_text(strip=True) if strong_tag else None
-    text_after_strong = strong_tag.next_sibling if strong_tag else ""
+    strong_tag = summary_with_date.find(".//strong")
+    date_str = text_content(strong_tag) if strong_tag is not None else None
+    text_after_strong = strong_tag.tail if strong_tag is not None else ""
 
     if not date_str:
-        LOGGER.warning(f"Missing date in summary: {summary_with_date}")
+        LOGGER.warning(f"Missing date in summary: {text_content(summary_with_date, ' ')}")
         return None, None
 
     time_match = re.search(r"(\d{1,2}(?::\d{2}|.\d{2})?\s*(?:π\.μ\.|μ\.μ\.))", text_after_strong or "")
-    time_str = convert_greek_time_to_24h(time_match.group(1)) if time_match else "21:00"
+    time_str = convert_greek_time_to_24h(time_match.group(1)) if time_match else PLACEHOLDER_TIME.strftime("%H:%M")
 
-    datetime_str = f"{date_str} {time_str} {CURRENT_YEAR}"
+    # Parse against a leap year so 29/02 is accepted, then pick the real year
+    datetime_str = f"{date_str} {time_str} 2000"
     try:
         dt = datetime.strptime(datetime_str, "%d/%m %H:%M %Y")
+        dt = dt.replace(year=nearest_year(dt.month, dt.day, reference or date.today()))
         return dt, dt
     except ValueError:
         LOGGER.warning(f"Could not parse datetime: {datetime_str}")
         return None, None
 
 
+def guide_url(day: date, today: date) -> str:
+    if day == today:
+        return BASE_URL
+    return DAY_URL_TEMPLATE.format(date=day.strftime(DAY_URL_DATE_FORMAT))
+
+
+async def crawl_guide_day(crawler, semaphore, config, day: date, url: str) -> list[EventRecord]:
+    async with semaphore:
+        result = await crawler.arun(url=url, config=config)
+
+    with stage("extract"):
+        data = json.loads(result.extracted_content)
+    cleaned_data = []
+
+    with stage("normalize"):
+        summaries = parse_fragments([event.get("summary_raw", "") for event in data])
+        for event, summary in zip(data, summaries):
+            start_date, end_date = summary_datetime(summary, day)
+
+            if not start_date:
+                count_dropped()
+                continue
+
+            details_url = event.get("detailsUrl", "")
+            if details_url.startswith("/"):
+                details_url = urljoin("https://www.athinorama.gr/", details_url)
+
+            record = make_record(
+                title=event.get("title", "").strip(),
+                location=event.get("location", "").strip(),
+                start_date=start_date,
+                end_date=end_date,
+                imageUrl=None,  # not provided
+                detailsUrl=details_url,
+                sourceName="athinorama.gr",
+                sourceUrl=BASE_URL,
+            )
+            if record:
+                cleaned_data.append(record)
+
+    LOGGER.info(f"📅 athinorama.gr {day:%d/%m}: {len(cleaned_data)} events")
+    return cleaned_data
+
+
+def event_key(event: EventRecord) -> tuple:
+    """How save_events_to_db tells rows apart: by detailsUrl, else title, venue and dates."""
+    if event.detailsUrl:
+        return (event.detailsUrl,)
+    return (event.title, event.location, event.start_date, event.end_date)
+
+
+def merge_listings(first: EventRecord, other: EventRecord) -> EventRecord:
+    """
+    Multi-day events are listed on every day they run, all under one
+    detailsUrl; keep the earliest start and stretch end_date over the
+    latest listing.
+    """
+    if other.start_date < first.start_date:
+        first, other = other, first
+    end_date = max(first.end_date or first.start_date, other.end_date or other.start_date)
+    return replace(first, end_date=end_date) if end_date != first.end_date else first
+
+
 async def crawl_athinorama():
+    today = date.today()
+    days = [today + timedelta(days=offset) for offset in range(max(GUIDE_DAYS, 1))]
     LOGGER.info(f"Crawling athinorama.gr")
-    LOGGER.info(f"URL: {BASE_URL}")
+    LOGGER.info(f"URL: {BASE_URL} ({len(days)} days, {GUIDE_CONCURRENCY} at a time)")
 
     schema = {
         "name": "Athinorama",
@@ -80,35 +173,25 @@ async def crawl_athinorama():
         extraction_strategy=extraction_strategy,
     )
 
-    async with AsyncWebCrawler(verbose=True) as crawler:
-        result = await crawler.arun(url=BASE_URL, config=config)
-        if not result.success:
-            LOGGER.error(f"Crawl failed: {result.error_message}")
-            return []
-
-        data = json.loads(result.extracted_content)
-        cleaned_data = []
-
-        for event in data:
-            start_date, end_date = parse_event_datetime(event.get("summary_raw", ""))
-
-            if not start_date:
-                continue
-
-            details_url = event.get("detailsUrl", "")
-            if details_url.startswith("/"):
-                details_url = urljoin("https://www.athinorama.gr/", details_url)
-
-            cleaned_data.append({
-                "title": event.get("title", "").strip(),
-                "location": event.get("location", "").strip(),
-                "start_date": start_date,
-                "end_date": end_date,
-                "imageUrl": None,  # not provided
-                "detailsUrl": details_url,
-                "sourceName": "athinorama.gr",
-                "sourceUrl": BASE_URL,
-            })
-
-        LOGGER.info(f"✅ Completed crawling athinorama.gr ({len(cleaned_data)} events)")
-        return cleaned_data
+    semaphore = asyncio.Semaphore(max(GUIDE_CONCURRENCY, 1))
+    merged: dict[tuple, EventRecord] = {}
+    async with open_crawler(verbose=True) as crawler:
+        tasks = [
+            asyncio.create_task(crawl_guide_day(crawler, semaphore, config, day, guide_url(day, today)))
+            for day in days
+        ]
+        try:
+            # Days are fetched concurrently and finish in any order
+            for next_page in asyncio.as_completed(tasks):
+                for event in await next_page:
+                    key = event_key(event)
+                    merged[key] = merge_listings(merged[key], event) if key in merged else event
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    # Yielded once every day is in, so the stored dates don't depend on fetch order
+    for event in merged.values():
+        yield event
+
+    LOGGER.info(f"✅ Completed crawling athinorama.gr ({len(merged)} events)")
@@ -1,9 +1,11 @@
 import re
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 
 from utils.helper import LOGGER
+from utils.html import parse_document, run_in_process, text_content
+from utils.metrics import stage
+from utils.records import make_record
+from utils.replay import http_get
 
 BASE_URL = "https://www.clubber.gr/events"
 
@@ -35,6 +37,39 @@ def adjust_end_date(start_dt: datetime | None, end_dt: datetime | None) -> datet
     return end_dt
 
 
+def extract_clubber_rows(page_html: str) -> list[tuple]:
+    """
+    Parse the events page into (date heading, title, text, text with spaces,
+    image) rows. Runs in a worker process, so it only returns plain data.
+    """
+    rows = []
+    current_date = None
+    for element in parse_document(page_html).cssselect(".em-events-list-grouped > *"):
+        # Update current date when an <h2> is found
+        if element.tag == "h2":
+            current_date = text_content(element)
+            continue
+
+        # Each event block is a styled <div>
+        if element.tag == "div" and "display: flex" in element.get("style", ""):
+            images = element.cssselect("img")
+            bold = element.cssselect("b")
+            title = text_content(bold[0]) if bold else ""
+
+            # Clean up inline <b> tags so they don’t leak into location
+            for b in bold:
+                b.drop_tree()
+
+            rows.append((
+                current_date,
+                title,
+                text_content(element, strip=False),
+                text_content(element, " "),
+                images[0].get("src") if images else None,
+            ))
+    return rows
+
+
 async def crawl_clubber():
     LOGGER.info(f"Crawling clubber.gr")
     LOGGER.info(f"URL: {BASE_URL}")
@@ -47,55 +82,39 @@ async def crawl_clubber():
         )
     }
 
-    try:
-        res = requests.get(BASE_URL, headers=headers, timeout=15)
-        res.raise_for_status()
-    except requests.RequestException as e:
-        LOGGER.error(f"❌ Failed to fetch {BASE_URL}: {e}")
-        return []
+    res = await http_get(BASE_URL, headers=headers, timeout=15)
+    res.raise_for_status()
 
-    soup = BeautifulSoup(res.text, "html.parser")
+    with stage("extract"):
+        rows = await run_in_process(extract_clubber_rows, res.text)
     events = []
-    current_date = None
-
-    for element in soup.select(".em-events-list-grouped > *"):
-        # Update current date when an <h2> is found
-        if element.name == "h2":
-            current_date = element.get_text(strip=True)
-            continue
-
-        # Each event block is a styled <div>
-        if element.name == "div" and "display: flex" in element.get("style", ""):
-            img = element.select_one("img")
-            title_tag = element.select_one("b")
-            title = title_tag.get_text(strip=True) if title_tag else ""
-
-            # Clean up inline <b> tags so they don’t leak into location
-            for b in element.select("b"):
-                b.decompose()
 
+    with stage("normalize"):
+        for current_date, title, text, location_text, image_url in rows:
             # Extract location (remove any time ranges)
-            location_text = element.get_text(separator=" ", strip=True)
             location = re.sub(r"\d{1,2}:\d{2}\s*–\s*\d{1,2}:\d{2}", "", location_text).strip()
 
             # Extract time range
-            time_match = re.search(r"(\d{1,2}:\d{2})\s*–\s*(\d{1,2}:\d{2})", element.get_text())
+            time_match = re.search(r"(\d{1,2}:\d{2})\s*–\s*(\d{1,2}:\d{2})", text)
             start_str, end_str = time_match.groups() if time_match else (None, None)
 
             start_dt = parse_event_time(current_date, start_str)
             end_dt = parse_event_time(current_date, end_str)
             end_dt = adjust_end_date(start_dt, end_dt)
 
-            events.append({
-                "title": title,
-                "start_date": start_dt,
-                "end_date": end_dt,
-                "location": location,
-                "imageUrl": img["src"] if img else None,
-                "detailsUrl": None,  # clubber doesn't have per-event pages
-                "sourceName": "clubber.gr",
-                "sourceUrl": BASE_URL,
-            })
-
+            record = make_record(
+                title=title,
+                start_date=start_dt,
+                end_date=end_dt,
+                location=location,
+                imageUrl=image_url,
+                detailsUrl=None,  # clubber doesn't have per-event pages
+                sourceName="clubber.gr",
+                sourceUrl=BASE_URL,
+            )
+            if record:
+                events.append(record)
+
+    for event in events:
+        yield event
     LOGGER.info(f"✅ Completed crawling clubber.gr ({len(events)} events)")
-    return events
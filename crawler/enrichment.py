@@ -0,0 +1,165 @@
+"""
+Optional detail-page enrichment, run after the crawlers have committed.
+
+Visits the detailsUrl of events listed in the run that have no cached
+detail data for their current listing entry, and fills in what the
+listings lack: exact start times, images, prices and genres. Data is read
+from schema.org JSON-LD (which most ticketing sites embed) and og:image.
+Pages are fetched concurrently, at most ENRICH_PER_HOST at a time per site.
+"""
+import os
+import json
+import asyncio
+from datetime import datetime
+from urllib.parse import urlparse
+from zoneinfo import ZoneInfo
+
+from database.crud import events_needing_enrichment, save_enrichment
+from utils.helper import LOGGER
+from utils.html import parse_document, run_in_process
+from utils.replay import http_get
+
+ENRICH_CONCURRENCY = int(os.getenv("ENRICH_CONCURRENCY", "8"))
+ENRICH_PER_HOST = int(os.getenv("ENRICH_PER_HOST", "2"))
+ENRICH_MAX_PAGES = int(os.getenv("ENRICH_MAX_PAGES", "300"))
+
+LOCAL_TZ = ZoneInfo("Europe/Athens")
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/137.0.0.0 Safari/537.36"
+    )
+}
+CURRENCY_SYMBOLS = {"EUR": "€", "USD": "$", "GBP": "£"}
+
+
+def jsonld_items(payload):
+    """Flatten JSON-LD lists and @graph containers into individual items."""
+    if isinstance(payload, list):
+        for item in payload:
+            yield from jsonld_items(item)
+    elif isinstance(payload, dict):
+        if "@graph" in payload:
+            yield from jsonld_items(payload["@graph"])
+        else:
+            yield payload
+
+
+def is_event(item: dict) -> bool:
+    types = item.get("@type", [])
+    types = [types] if isinstance(types, str) else types
+    return any(isinstance(t, str) and t.endswith("Event") for t in types)
+
+
+def parse_start(value) -> str | None:
+    """ISO start time as naive Athens wall-clock time (how events are stored); dates without a time are ignored."""
+    if not isinstance(value, str) or "T" not in value:
+        return None
+    try:
+        start = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if start.tzinfo is not None:
+        start = start.astimezone(LOCAL_TZ).replace(tzinfo=None)
+    return start.isoformat()
+
+
+def first_image(value) -> str | None:
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        value = value.get("url")
+    return value if isinstance(value, str) and value else None
+
+
+def format_price(offers) -> str | None:
+    offers = offers if isinstance(offers, list) else [offers]
+    prices, currency = [], None
+    for offer in offers:
+        if not isinstance(offer, dict):
+            continue
+        currency = currency or offer.get("priceCurrency")
+        for key in ("price", "lowPrice", "highPrice"):
+            try:
+                prices.append(float(str(offer[key]).replace(",", ".")))
+            except (KeyError, ValueError):
+                continue
+    if not prices:
+        return None
+    symbol = CURRENCY_SYMBOLS.get(currency, f"{currency} " if currency else "")
+    low, high = min(prices), max(prices)
+    amount = f"{low:g}" if low == high else f"{low:g}-{high:g}"
+    return f"{symbol}{amount}"
+
+
+def format_genres(item: dict) -> str | None:
+    genres = item.get("genre") or item.get("keywords")
+    if isinstance(genres, str):
+        genres = genres.split(",")
+    if not isinstance(genres, list):
+        return None
+    genres = [g.strip() for g in genres if isinstance(g, str) and g.strip()]
+    return ", ".join(dict.fromkeys(genres)) or None
+
+
+def extract_detail_data(page_html: str) -> dict:
+    """
+    Enrichment fields found on a detail page. Runs in the HTML worker pool,
+    so it takes and returns plain (JSON-serialisable) data.
+    """
+    doc = parse_document(page_html)
+    data = {}
+    for script in doc.xpath('//script[@type="application/ld+json"]'):
+        try:
+            payload = json.loads(script.text or "")
+        except ValueError:
+            continue
+        event = next((item for item in jsonld_items(payload) if is_event(item)), None)
+        if event is None:
+            continue
+        data = {
+            "start_date": parse_start(event.get("startDate")),
+            "imageUrl": first_image(event.get("image")),
+            "price": format_price(event.get("offers")),
+            "genres": format_genres(event),
+        }
+        break
+
+    if not data.get("imageUrl"):
+        og_image = doc.xpath('//meta[@property="og:image"]/@content')
+        if og_image:
+            data["imageUrl"] = og_image[0]
+    return {key: value for key, value in data.items() if value}
+
+
+async def fetch_detail(url: str, semaphore: asyncio.Semaphore, host_limits: dict) -> dict | None:
+    host = urlparse(url).netloc
+    host_limit = host_limits.setdefault(host, asyncio.Semaphore(ENRICH_PER_HOST))
+    try:
+        async with semaphore, host_limit:
+            res = await http_get(url, headers=HEADERS, timeout=15)
+        res.raise_for_status()
+        return await run_in_process(extract_detail_data, res.text)
+    except Exception as e:
+        LOGGER.warning(f"⚠️ Could not enrich {url}: {e}")
+        return None
+
+
+async def enrich_run(run_id: int) -> int:
+    """Enrich the events listed in `run_id`, from at most ENRICH_MAX_PAGES pages; returns how many events changed."""
+    targets = await events_needing_enrichment(run_id, ENRICH_MAX_PAGES)
+    urls = list(dict.fromkeys(url for _, url, _ in targets))
+    if not urls:
+        LOGGER.info("🔎 Nothing to enrich")
+        return 0
+
+    LOGGER.info(f"🔎 Enriching {len(targets)} events from {len(urls)} detail pages")
+    semaphore = asyncio.Semaphore(ENRICH_CONCURRENCY)
+    host_limits: dict[str, asyncio.Semaphore] = {}
+    results = await asyncio.gather(*(fetch_detail(url, semaphore, host_limits) for url in urls))
+    pages = {url: data for url, data in zip(urls, results) if data is not None}
+
+    changed = await save_enrichment(pages, targets)
+    LOGGER.info(f"✅ Enrichment fetched {len(pages)}/{len(urls)} pages, updated {changed} events")
+    return changed
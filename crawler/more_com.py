@@ -4,6 +4,9 @@ from urllib.parse import urljoin
 from playwright.async_api import async_playwright
 
 from utils.helper import LOGGER
+from utils.metrics import stage, count_dropped
+from utils.records import PLACEHOLDER_TIME, make_record
+from utils.replay import capture
 
 BASE_URL = "https://www.more.com/gr-el/tickets/music/"
 
@@ -21,7 +24,11 @@ ENGLISH_MONTHS = {
     "SEPTEMBER": 9, "OCTOBER": 10, "NOVEMBER": 11, "DECEMBER": 12
 }
 
-MAX_RETRIES = 3
+# Scrolling the whole listing takes a while; allow more than the default fetch timeout.
+# A timeout is not retried, so this is also the most a hung more.com costs the run.
+FETCH_TIMEOUT_SECONDS = 600
+
+
 async def scroll_until_footer(page, pause=0.8):
     footer_selector = "div.footer__copyright"
 
@@ -119,14 +126,32 @@ def parse_greek_date(date_text: str):
                 end_year += 1
             start_dt = datetime(start_year, start_month, start_day)
             end_dt = datetime(end_year, end_month, end_day)
-    start_dt = start_dt.replace(hour=21)
-    end_dt = end_dt.replace(hour=21)
+    start_dt = datetime.combine(start_dt.date(), PLACEHOLDER_TIME)
+    end_dt = datetime.combine(end_dt.date(), PLACEHOLDER_TIME)
     # Fallback
     return start_dt, end_dt
 
-async def crawl_more_com_once():
-    LOGGER.info("🚀 Starting crawl for more.com")
-
+# Pull every field in one round trip instead of ~6 element-handle calls per event
+EXTRACT_EVENTS_JS = """
+(cards) => cards.map((card) => {
+    const text = (selector) => {
+        const el = card.querySelector(selector);
+        return el ? el.innerText : null;
+    };
+    const img = card.querySelector("aside.playimage img");
+    return {
+        title: text("h3.playinfo__title"),
+        location: text("div.playinfo__venue"),
+        detailsUrl: card.getAttribute("href"),
+        imageUrl: img ? img.getAttribute("src") : null,
+        date: text("time.playinfo__date") || "",
+    };
+})
+"""
+
+
+async def fetch_raw_events():
+    """Load the listing in a real browser and return the raw per-event fields."""
     async with async_playwright() as p:
         browser = await p.chromium.launch(
             headless=False,
@@ -154,58 +179,50 @@ async def crawl_more_com_once():
         await scroll_until_footer(page)
 
         LOGGER.info("Extracting event elements...")
-        events = await page.query_selector_all("a.play-template__main")
-        LOGGER.info(f"Found {len(events)} events")
-
-        results = []
-        for idx, event_el in enumerate(events, start=1):
-            try:
-                LOGGER.info(f"Parsing event {idx}/{len(events)}...")
-                title_el = await event_el.query_selector("h3.playinfo__title")
-                title = await title_el.inner_text() if title_el else None
+        raw_events = await page.eval_on_selector_all("a.play-template__main", EXTRACT_EVENTS_JS)
+        await browser.close()
+        return raw_events
 
-                loc_el = await event_el.query_selector("div.playinfo__venue")
-                location = await loc_el.inner_text() if loc_el else None
 
-                details_url = await event_el.get_attribute("href")
-                img_el = await event_el.query_selector("aside.playimage img")
-                image_url = await img_el.get_attribute("src") if img_el else None
+async def crawl_more_com():
+    LOGGER.info("🚀 Starting crawl for more.com")
 
-                date_el = await event_el.query_selector("time.playinfo__date")
-                date_text = await date_el.inner_text() if date_el else ""
+    # Errors are retried with backoff by the shared fetch policy (utils/resilience.py); timeouts are not
+    raw_events = await capture("playwright", BASE_URL, fetch_raw_events, timeout=FETCH_TIMEOUT_SECONDS)
+    LOGGER.info(f"Found {len(raw_events)} events")
 
-                start_date, end_date = parse_greek_date(date_text)
+    results = []
+    with stage("normalize"):
+        for idx, raw in enumerate(raw_events, start=1):
+            try:
+                LOGGER.info(f"Parsing event {idx}/{len(raw_events)}...")
+                start_date, end_date = parse_greek_date(raw["date"])
 
+                details_url = raw["detailsUrl"]
+                image_url = raw["imageUrl"]
                 if details_url and details_url.startswith("/"):
                     details_url = urljoin("https://www.more.com", details_url)
                 if image_url and image_url.startswith("/"):
                     image_url = urljoin("https://www.more.com", image_url)
 
-                results.append({
-                    "title": title,
-                    "location": location,
-                    "detailsUrl": details_url,
-                    "imageUrl": image_url,
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    "sourceName": "more.com",
-                    "sourceUrl": BASE_URL
-                })
+                record = make_record(
+                    title=raw["title"],
+                    location=raw["location"],
+                    detailsUrl=details_url,
+                    imageUrl=image_url,
+                    start_date=start_date,
+                    end_date=end_date,
+                    sourceName="more.com",
+                    sourceUrl=BASE_URL
+                )
+                if record:
+                    results.append(record)
             except Exception as e:
                 LOGGER.warning(f"⚠️ Failed to parse event {idx}: {e}")
+                count_dropped()
                 continue
 
-        LOGGER.info(f"✅ Completed crawling more.com ({len(results)} events parsed)")
-        await browser.close()
-        return results
-    
+    for event in results:
+        yield event
+    LOGGER.info(f"✅ Completed crawling more.com ({len(results)} events parsed)")
 
-async def crawl_more_com():
-    for attempt in range(1, MAX_RETRIES + 1):
-        try:
-            return await crawl_more_com_once()
-        except Exception as e:
-            LOGGER.error(f"Attempt {attempt}/{MAX_RETRIES} failed: {e}")
-            if attempt == MAX_RETRIES:
-                raise
-            await asyncio.sleep(3)
\ No newline at end of file
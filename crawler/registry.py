@@ -0,0 +1,46 @@
+import importlib
+from dataclasses import dataclass
+from datetime import timedelta
+
+
+@dataclass(frozen=True)
+class CrawlerSpec:
+    """
+    A crawler known to main.py. Its module (and with it crawl4ai, Playwright,
+    lxml, requests, ...) is only imported by load(), i.e. when the
+    crawler actually runs.
+    """
+    name: str            # sourceName the crawler writes, also its CLI name
+    module: str
+    func: str
+    kind: str            # "browser" (crawl4ai / Playwright) or "http"
+    schedule: timedelta  # default interval between crawls, used by --due
+
+    def load(self):
+        return getattr(importlib.import_module(self.module), self.func)
+
+
+# Registry of all crawlers, in default run order
+CRAWLERS = [
+    CrawlerSpec("iereiestisnychtas.com", "crawler.iereies_tis_nychtas", "crawl_iereies", "browser", timedelta(hours=12)),
+    CrawlerSpec("aptaliko.gr", "crawler.aptaliko", "crawl_aptaliko", "browser", timedelta(hours=12)),
+    CrawlerSpec("athinorama.gr", "crawler.athinorama", "crawl_athinorama", "browser", timedelta(hours=6)),
+    CrawlerSpec("clubber.gr", "crawler.clubber", "crawl_clubber", "http", timedelta(hours=6)),
+    CrawlerSpec("more.com", "crawler.more_com", "crawl_more_com", "browser", timedelta(hours=24)),
+    CrawlerSpec("ticketmaster.gr", "crawler.ticketmaster", "crawl_ticketmaster", "browser", timedelta(hours=24)),
+    CrawlerSpec("ticketservices.gr", "crawler.ticketservices", "crawl_ticketservices", "browser", timedelta(hours=24)),
+]
+
+REGISTRY = {spec.name: spec for spec in CRAWLERS}
+
+
+def select_crawlers(names: list[str] | None = None, kind: str | None = None) -> list[CrawlerSpec]:
+    """Resolve CLI source names (registry order is kept); raises ValueError for unknown names."""
+    if names:
+        unknown = [name for name in names if name not in REGISTRY]
+        if unknown:
+            raise ValueError(f"Unknown source(s): {', '.join(unknown)}. Known: {', '.join(REGISTRY)}")
+    return [
+        spec for spec in CRAWLERS
+        if (not names or spec.name in names) and (not kind or spec.kind == kind)
+    ]
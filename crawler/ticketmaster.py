@@ -2,10 +2,13 @@ import json
 from datetime import datetime
 from urllib.parse import urljoin
 
-from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CacheMode
+from crawl4ai import CrawlerRunConfig, CacheMode
 from crawl4ai import JsonCssExtractionStrategy
 
 from utils.helper import LOGGER
+from utils.metrics import stage, count_dropped
+from utils.records import make_record
+from utils.replay import open_crawler
 
 CURRENT_YEAR = datetime.now().year
 BASE_URL = "https://www.ticketmaster.gr/_sce_category_s_Music.html"
@@ -48,46 +51,46 @@ async def crawl_ticketmaster():
     extraction_strategy = JsonCssExtractionStrategy(schema, verbose=True)
     config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS, extraction_strategy=extraction_strategy)
 
-    async with AsyncWebCrawler(verbose=True) as crawler:
+    async with open_crawler(verbose=True) as crawler:
         result = await crawler.arun(url=BASE_URL, config=config)
 
-        if not result.success:
-            LOGGER.error(f"Crawl failed: {result.error_message}")
-            return []
-
         try:
-            data = json.loads(result.extracted_content)
+            with stage("extract"):
+                data = json.loads(result.extracted_content)
         except json.JSONDecodeError as e:
             LOGGER.error(f"JSON decode error: {e}")
             LOGGER.info(f"Raw extracted content: {result.extracted_content[:1000]}...")
-            return []
+            return
 
         LOGGER.info(f"Found {len(data)} events")
         cleaned_data = []
 
-        for i, event in enumerate(data):
-            title = event.get('title', f'Unknown Event {i+1}').strip()
-            location = event.get('location', 'Unknown').strip()
-
-            start_date = parse_ticketmaster_date(event.get("start_date", ""))
-            end_date = parse_ticketmaster_date(event.get("end_date", ""))
-
-            if not start_date:
-                LOGGER.warning(f"❌ Skipping event {title}: no valid start date")
-                continue
-
-            cleaned_event = {
-                "title": title,
-                "location": location,
-                "start_date": start_date,
-                "end_date": end_date,
-                "detailsUrl": fix_url(event.get("detailsUrl", "").strip()),
-                "imageUrl": fix_url(event.get("imageUrl", "").strip()),
-                "sourceName": "ticketmaster.gr",
-                "sourceUrl": BASE_URL
-            }
-
-            cleaned_data.append(cleaned_event)
-
-        LOGGER.info(f"✅ Completed crawling ticketmaster.gr ({len(cleaned_data)} events parsed)")
-        return cleaned_data
+        with stage("normalize"):
+            for i, event in enumerate(data):
+                title = event.get('title', f'Unknown Event {i+1}').strip()
+                location = event.get('location', 'Unknown').strip()
+
+                start_date = parse_ticketmaster_date(event.get("start_date", ""))
+                end_date = parse_ticketmaster_date(event.get("end_date", ""))
+
+                if not start_date:
+                    LOGGER.warning(f"❌ Skipping event {title}: no valid start date")
+                    count_dropped()
+                    continue
+
+                record = make_record(
+                    title=title,
+                    location=location,
+                    start_date=start_date,
+                    end_date=end_date,
+                    detailsUrl=fix_url(event.get("detailsUrl", "").strip()),
+                    imageUrl=fix_url(event.get("imageUrl", "").strip()),
+                    sourceName="ticketmaster.gr",
+                    sourceUrl=BASE_URL
+                )
+                if record:
+                    cleaned_data.append(record)
+
+    for event in cleaned_data:
+        yield event
+    LOGGER.info(f"✅ Completed crawling ticketmaster.gr ({len(cleaned_data)} events parsed)")
@@ -2,11 +2,14 @@ import json
 from datetime import datetime
 from urllib.parse import urljoin
 import re
-from bs4 import BeautifulSoup
 
-from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CacheMode
+from crawl4ai import CrawlerRunConfig, CacheMode
 from crawl4ai import JsonCssExtractionStrategy
 from utils.helper import LOGGER
+from utils.html import strip_tags
+from utils.metrics import stage
+from utils.records import PLACEHOLDER_TIME, make_record
+from utils.replay import open_crawler
 
 BASE_URL = "https://www.ticketservices.gr/en/LiveConcerts/"
 
@@ -21,7 +24,7 @@ def parse_ticketservices_dates(data_dates: str):
     parsed_dates = []
     for part in date_parts:
         try:
-            parsed_dates.append(datetime.strptime(part.strip(), "%Y-%m-%d").replace(hour=21))
+            parsed_dates.append(datetime.combine(datetime.strptime(part.strip(), "%Y-%m-%d").date(), PLACEHOLDER_TIME))
         except Exception:
             continue
 
@@ -51,44 +54,44 @@ async def crawl_ticketservices():
     extraction_strategy = JsonCssExtractionStrategy(schema, verbose=True)
     config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS, extraction_strategy=extraction_strategy)
 
-    async with AsyncWebCrawler(verbose=True) as crawler:
+    async with open_crawler(verbose=True) as crawler:
         result = await crawler.arun(url=BASE_URL, config=config)
 
-        if not result.success:
-            LOGGER.error(f"Crawl failed: {result.error_message}")
-            return []
-
         try:
-            data = json.loads(result.extracted_content)
+            with stage("extract"):
+                data = json.loads(result.extracted_content)
         except json.JSONDecodeError as e:
             LOGGER.error(f"JSON decode error: {e}")
             LOGGER.info(f"Raw extracted content: {result.extracted_content[:1000]}...")
-            return []
+            return
 
         cleaned_data = []
-        for i, event in enumerate(data):
-            # Clean title (remove HTML / <br>)
-            title_html = event.get("title", f"Unknown Event {i+1}")
-            title = BeautifulSoup(title_html, "html.parser").get_text(separator=" ").strip()
-
-            # Clean location
-            location = event.get("location", "").strip()
-
-            # Parse dates
-            data_dates = event.get("dates", "")  # 'dates' comes from data-dates attribute
-            start_date, end_date = parse_ticketservices_dates(data_dates)
-
-            cleaned_event = {
-                "title": title,
-                "location": location,
-                "start_date": start_date,
-                "end_date": end_date,
-                "detailsUrl": urljoin(BASE_URL, event.get("detailsUrl", "").strip()),
-                "imageUrl": urljoin(BASE_URL, event.get("imageUrl", "").strip()),
-                "sourceName": "ticketservices.gr",
-                "sourceUrl": BASE_URL,
-            }
-            cleaned_data.append(cleaned_event)
-
-        LOGGER.info(f"✅ Completed crawling ticketservices.gr ({len(cleaned_data)} events parsed)")
-        return cleaned_data
+        with stage("normalize"):
+            for i, event in enumerate(data):
+                # Clean title (remove HTML / <br>)
+                title_html = event.get("title", f"Unknown Event {i+1}")
+                title = strip_tags(title_html)
+
+                # Clean location
+                location = event.get("location", "").strip()
+
+                # Parse dates
+                data_dates = event.get("dates", "")  # 'dates' comes from data-dates attribute
+                start_date, end_date = parse_ticketservices_dates(data_dates)
+
+                record = make_record(
+                    title=title,
+                    location=location,
+                    start_date=start_date,
+                    end_date=end_date,
+                    detailsUrl=urljoin(BASE_URL, event.get("detailsUrl", "").strip()),
+                    imageUrl=urljoin(BASE_URL, event.get("imageUrl", "").strip()),
+                    sourceName="ticketservices.gr",
+                    sourceUrl=BASE_URL,
+                )
+                if record:
+                    cleaned_data.append(record)
+
+    for event in cleaned_data:
+        yield event
+    LOGGER.info(f"✅ Completed crawling ticketservices.gr ({len(cleaned_data)} events parsed)")
@@ -1,53 +1,404 @@
-from sqlalchemy import and_, or_
+import os
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_, func, delete, insert, update
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.future import select
-from database.db import Event, AsyncSessionLocal, init_db
+from database.db import (
+    Event, EventDailyStat, Venue, CrawlRun, CrawlRunSource, DetailPage, QuarantinedEvent, AsyncSessionLocal, init_db,
+    notify_event_changes,
+)
+from database.venues import resolve_venue_ids
 from utils.helper import LOGGER
+from utils.metrics import SourceStats
+from utils.records import EventRecord, InvalidEventError, apply_enrichment
+
+EVENT_FIELDS = (
+    "title", "start_date", "end_date", "location", "imageUrl", "detailsUrl", "sourceName", "sourceUrl", "venue_id",
+    "price", "genres", "listing_hash",
+)
+# Fields the enrichment stage may change (see utils.records.apply_enrichment)
+ENRICHED_FIELDS = ("start_date", "end_date", "imageUrl", "price", "genres")
+
+
+# Refuse to sweep when more than this share of a source's upcoming events went missing
+SWEEP_MAX_FRACTION = float(os.getenv("EVENT_SWEEP_MAX_FRACTION", "0.5"))
+
+# Start dates outside this window are parse errors (e.g. a wrongly inferred year)
+PLAUSIBLE_YEARS_BACK = 1
+PLAUSIBLE_YEARS_AHEAD = 3
+
+
+def validate_events(events) -> tuple[list[EventRecord], list[tuple[dict, str]]]:
+    """
+    Bulk checks before anything is written: coerce stray dicts into
+    EventRecords and reject implausible dates. Returns (valid, rejected)
+    where rejected holds (payload, reason) pairs for the quarantine.
+    """
+    today = datetime.now()
+    earliest = today.replace(year=today.year - PLAUSIBLE_YEARS_BACK, month=1, day=1)
+    latest = today.replace(year=today.year + PLAUSIBLE_YEARS_AHEAD, month=12, day=31)
+    valid, rejected = [], []
+    for event in events:
+        if not isinstance(event, EventRecord):
+            try:
+                event = EventRecord.from_dict(event)
+            except InvalidEventError as e:
+                rejected.append((event, f"invalid: {e}"))
+                continue
+        if event.start_date is not None and not earliest <= event.start_date <= latest:
+            rejected.append((event.as_dict(), f"implausible start_date {event.start_date}"))
+            continue
+        valid.append(event)
+    return valid, rejected
+
+
+async def upsert_event(session, e: dict, counts: dict, changed: list, now: datetime):
+    existing = None
+    # 1️⃣ Prefer matching by detailsUrl if available
+    if e.get("detailsUrl"):
+        # Same start_date first so the lookup prunes to a single partition,
+        # then fall back to every partition in case the date moved
+        result = await session.execute(select(Event).where(
+            Event.detailsUrl == e["detailsUrl"], Event.start_date == e["start_date"]
+        ).limit(1))
+        existing = result.scalar_one_or_none()
+        query = select(Event).where(Event.detailsUrl == e["detailsUrl"]).limit(1)
+    else:
+        # 2️⃣ Otherwise, try to find event with same title + location
+        query = select(Event).where(
+            and_(
+                Event.title == e["title"],
+                Event.location == e["location"],
+                or_(
+                    # case A: existing record has no dates (we'll update it)
+                    and_(Event.start_date.is_(None), Event.end_date.is_(None)),
+                    # case B: existing record has *same* dates (we skip update)
+                    and_(
+                        Event.start_date == e["start_date"],
+                        Event.end_date == e["end_date"],
+                    ),
+                )
+            )
+        ).limit(1)
+
+    if existing is None:
+        result = await session.execute(query)
+        existing = result.scalar_one_or_none()
+
+    if existing:
+        existing.last_seen_run_id = e["last_seen_run_id"]
+        if existing.deleted_at is None and all(getattr(existing, f) == e[f] for f in EVENT_FIELDS):
+            counts["unchanged"] += 1
+            return
+        # Update existing event
+        existing.title = e["title"]
+        existing.start_date = e["start_date"]
+        existing.end_date = e["end_date"]
+        existing.location = e["location"]
+        existing.imageUrl = e["imageUrl"]
+        existing.detailsUrl = e["detailsUrl"]
+        existing.sourceName = e["sourceName"]
+        existing.sourceUrl = e["sourceUrl"]
+        existing.venue_id = e["venue_id"]
+        existing.price = e["price"]
+        existing.genres = e["genres"]
+        existing.listing_hash = e["listing_hash"]
+        existing.updated_at = now
+        existing.deleted_at = None  # listed again, so it is back
+        changed.append(existing)
+        counts["updated"] += 1
+    else:
+        # Insert new event
+        event = Event(**e, updated_at=now)
+        session.add(event)
+        changed.append(event)
+        counts["inserted"] += 1
+
+
+async def write_rows(session, rows: list[dict], counts: dict, changed: list, rejected: list):
+    """
+    Upsert rows inside a savepoint. If the database rejects the batch, the
+    savepoint is rolled back and the halves are retried, down to the single
+    failing rows, which go to `rejected`; every other row is kept.
+    """
+    batch_counts = dict.fromkeys(("inserted", "updated", "unchanged"), 0)
+    batch_changed = []
+    now = datetime.now()
+    try:
+        async with session.begin_nested():
+            for e in rows:
+                await upsert_event(session, e, batch_counts, batch_changed, now)
+            await session.flush()
+    except SQLAlchemyError as error:
+        if len(rows) == 1:
+            # The driver's message, without SQLAlchemy's statement / parameter dump
+            reason = str(getattr(error, "orig", None) or error)
+            rejected.append((rows[0], f"rejected by database: {reason}"[:500]))
+            return
+        middle = len(rows) // 2
+        await write_rows(session, rows[:middle], counts, changed, rejected)
+        await write_rows(session, rows[middle:], counts, changed, rejected)
+        return
+    for key, value in batch_counts.items():
+        counts[key] += value
+    changed.extend(batch_changed)
 
-async def save_events_to_db(events: list[dict]):
+
+async def save_events_to_db(events: list[EventRecord], run_id: int | None = None) -> dict:
+    """
+    Upsert events and return how many were inserted, updated, left unchanged
+    and quarantined. Rows that fail validation or that the database rejects
+    are stored in quarantined_events instead of rolling back the batch.
+    """
     LOGGER.info("Inserting/updating events in database")
     await init_db()
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "quarantined": 0}
+    events, rejected = validate_events(events)
+    venue_ids = await resolve_venue_ids(e.location for e in events)
+    rows = [
+        {**record.as_dict(), "venue_id": venue_ids.get(record.location), "last_seen_run_id": run_id,
+         "price": None, "genres": None, "listing_hash": record.listing_hash()}
+        for record in events
+    ]
 
     async with AsyncSessionLocal() as session:
-        for e in events:
-            # 1️⃣ Prefer matching by detailsUrl if available
-            if e.get("detailsUrl"):
-                query = select(Event).where(Event.detailsUrl == e["detailsUrl"]).limit(1)
-            else:
-                # 2️⃣ Otherwise, try to find event with same title + location
-                query = select(Event).where(
-                    and_(
-                        Event.title == e["title"],
-                        Event.location == e["location"],
-                        or_(
-                            # case A: existing record has no dates (we'll update it)
-                            and_(Event.start_date.is_(None), Event.end_date.is_(None)),
-                            # case B: existing record has *same* dates (we skip update)
-                            and_(
-                                Event.start_date == e["start_date"],
-                                Event.end_date == e["end_date"],
-                            ),
-                        )
-                    )
-                ).limit(1)
-
-
-            result = await session.execute(query)
-            existing = result.scalar_one_or_none()
-
-            if existing:
-                # Update existing event
-                existing.title = e["title"]
-                existing.start_date = e["start_date"]
-                existing.end_date = e["end_date"]
-                existing.location = e["location"]
-                existing.imageUrl = e["imageUrl"]
-                existing.detailsUrl = e["detailsUrl"]
-                existing.sourceName = e["sourceName"]
-                existing.sourceUrl = e["sourceUrl"]
-            else:
-                # Insert new event
-                event = Event(**e)
-                session.add(event)
+        # Re-apply cached detail-page data so the listing doesn't overwrite it
+        rows = await apply_cached_enrichment(session, rows)
+        changed = []
+        await write_rows(session, rows, counts, changed, rejected)
+
+        if rejected:
+            await quarantine(session, rejected)
+            counts["quarantined"] = len(rejected)
+        await notify_event_changes(session, {event.id for event in changed})
+        await session.commit()
+        LOGGER.info(f"Completed inserting/updating {len(rows)} events "
+                    f"({counts['inserted']} new, {counts['updated']} updated, {counts['unchanged']} unchanged, "
+                    f"{counts['quarantined']} quarantined)")
+    return counts
+
+
+async def apply_cached_enrichment(session, rows: list[dict]) -> list[dict]:
+    urls = {e["detailsUrl"] for e in rows if e["detailsUrl"]}
+    if not urls:
+        return rows
+    result = await session.execute(
+        select(DetailPage.url, DetailPage.listing_hash, DetailPage.data).where(DetailPage.url.in_(urls))
+    )
+    cache = {(url, listing_hash): data for url, listing_hash, data in result.all()}
+    return [
+        apply_enrichment(e, cache[(e["detailsUrl"], e["listing_hash"])])
+        if (e["detailsUrl"], e["listing_hash"]) in cache else e
+        for e in rows
+    ]
+
 
+async def events_needing_enrichment(run_id: int, max_pages: int) -> list[tuple[int, str, str]]:
+    """
+    (id, detailsUrl, listing_hash) of upcoming events listed in the run without
+    cached detail data, for at most `max_pages` distinct detail pages (soonest first).
+    """
+    needs_detail = (
+        Event.last_seen_run_id == run_id,
+        Event.deleted_at.is_(None),
+        Event.detailsUrl.is_not(None),
+        Event.listing_hash.is_not(None),
+        Event.start_date >= datetime.now(),
+        DetailPage.url.is_(None),
+    )
+    cached = and_(DetailPage.url == Event.detailsUrl, DetailPage.listing_hash == Event.listing_hash)
+    async with AsyncSessionLocal() as session:
+        # Several events (a tour's dates, a multi-day listing) can share one page
+        pages = (
+            select(Event.detailsUrl)
+            .outerjoin(DetailPage, cached)
+            .where(*needs_detail)
+            .group_by(Event.detailsUrl)
+            .order_by(func.min(Event.start_date))
+            .limit(max_pages)
+        )
+        result = await session.execute(
+            select(Event.id, Event.detailsUrl, Event.listing_hash)
+            .outerjoin(DetailPage, cached)
+            .where(*needs_detail, Event.detailsUrl.in_(pages.scalar_subquery()))
+            .order_by(Event.start_date)
+        )
+        return [tuple(row) for row in result.all()]
+
+
+async def save_enrichment(pages: dict[str, dict], targets: list[tuple[int, str, str]]) -> int:
+    """Cache fetched detail data and merge it into the events; returns how many events changed."""
+    now = datetime.now()
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(Event).where(Event.id.in_([event_id for event_id, _, _ in targets])))
+        events = {event.id: event for event in result.scalars()}
+        cached, changed = set(), []
+        for event_id, url, listing_hash in targets:
+            if url not in pages:
+                continue  # fetch failed; retried next run
+            if (url, listing_hash) not in cached:
+                await session.merge(DetailPage(url=url, listing_hash=listing_hash, data=pages[url], fetched_at=now))
+                cached.add((url, listing_hash))
+            event = events.get(event_id)
+            # Skip rows the listing changed (or removed) while the pages were being fetched
+            if event is None or event.deleted_at is not None or event.listing_hash != listing_hash:
+                continue
+            row = {name: getattr(event, name) for name in ENRICHED_FIELDS}
+            enriched = apply_enrichment(row, pages[url])
+            if enriched == row:
+                continue
+            for name in ENRICHED_FIELDS:
+                setattr(event, name, enriched[name])
+            event.updated_at = now
+            changed.append(event)
+        await session.flush()
+        await notify_event_changes(session, {event.id for event in changed})
         await session.commit()
-        LOGGER.info(f"Completed inserting/updating {len(events)} events")
+    return len(changed)
+
+
+async def quarantine(session, rejected: list[tuple[dict, str]]):
+    now = datetime.now()
+    for payload, reason in rejected:
+        source = payload.get("sourceName") if isinstance(payload, dict) else None
+        LOGGER.warning(f"🚧 Quarantined event from {source}: {reason}")
+        # JSON column: datetimes and other objects are stored as strings; Postgres
+        # can't store NUL characters in text, a common reason for landing here
+        payload = json.loads(json.dumps(payload, default=str).replace("\\u0000", "\\ufffd"))
+        session.add(QuarantinedEvent(
+            source=source or "unknown",
+            payload=payload,
+            reason=reason,
+            created_at=now,
+        ))
+
+
+async def sweep_stale_events(source_name: str, run_id: int, window_start: datetime, window_end: datetime) -> int:
+    """
+    Soft-delete the source's events the run didn't list, in one UPDATE.
+    Only events starting inside the window the crawl covered (from its start
+    to the latest start_date it saw) are considered, so past events and
+    events beyond a windowed source's horizon are left alone. Call only after
+    the source was crawled completely and successfully.
+    """
+    in_window = (
+        Event.sourceName == source_name,
+        Event.deleted_at.is_(None),
+        Event.start_date >= window_start,
+        Event.start_date <= window_end,
+    )
+    not_seen = or_(Event.last_seen_run_id.is_(None), Event.last_seen_run_id != run_id)
+    async with AsyncSessionLocal() as session:
+        active = (await session.execute(select(func.count()).select_from(Event).where(*in_window))).scalar()
+        stale = (await session.execute(select(func.count()).select_from(Event).where(*in_window, not_seen))).scalar()
+        if not stale:
+            return 0
+        if stale > active * SWEEP_MAX_FRACTION:
+            # More likely a broken listing (layout change, truncated page) than mass cancellations
+            LOGGER.warning(f"⚠️ Not sweeping {source_name}: {stale} of {active} upcoming events unseen")
+            return 0
+
+        now = datetime.now()
+        result = await session.execute(
+            update(Event).where(*in_window, not_seen)
+            .values(deleted_at=now, updated_at=now)
+            .returning(Event.id)
+            .execution_options(synchronize_session=False)
+        )
+        ids = result.scalars().all()
+        await notify_event_changes(session, ids)
+        await session.commit()
+    LOGGER.info(f"🧹 Marked {len(ids)} {source_name} events as removed (not listed in run #{run_id})")
+    return len(ids)
+
+
+async def refresh_event_stats(source_names):
+    """Rebuild the event_daily_stats rows of the given sources in one transaction."""
+    day = func.date(Event.start_date)
+    location = func.coalesce(Venue.name, Event.location, "")
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(EventDailyStat).where(EventDailyStat.source.in_(source_names)))
+        await session.execute(insert(EventDailyStat).from_select(
+            ["day", "source", "location", "events"],
+            select(day, Event.sourceName, location, func.count())
+            .select_from(Event)
+            .outerjoin(Venue, Venue.id == Event.venue_id)
+            .where(Event.sourceName.in_(source_names), Event.start_date.is_not(None), Event.deleted_at.is_(None))
+            .group_by(day, Event.sourceName, location)
+        ))
+        await session.commit()
+
+
+async def start_crawl_run() -> int:
+    """Open a crawl_runs ledger row and return its id."""
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        run = CrawlRun(started_at=datetime.now(), status="running")
+        session.add(run)
+        await session.commit()
+        return run.id
+
+
+async def record_crawl_source(run_id: int, stats: SourceStats, started_at: datetime, status: str):
+    async with AsyncSessionLocal() as session:
+        session.add(CrawlRunSource(
+            run_id=run_id,
+            source=stats.source,
+            started_at=started_at,
+            finished_at=datetime.now(),
+            status=status,
+            fetch_seconds=stats.timings["fetch"],
+            extract_seconds=stats.timings["extract"],
+            normalize_seconds=stats.timings["normalize"],
+            persist_seconds=stats.timings["persist"],
+            pages=stats.pages,
+            events=stats.events,
+            inserted=stats.inserted,
+            updated=stats.updated,
+            unchanged=stats.unchanged,
+            quarantined=stats.quarantined,
+            dropped=stats.dropped,
+            swept=stats.swept,
+            error_class=stats.error_class,
+            error_message=stats.error_message,
+            rss_start_kb=stats.rss_start_kb,
+            rss_end_kb=stats.rss_end_kb,
+        ))
+        await session.commit()
+
+
+async def finish_crawl_run(run_id: int, status: str, peak_rss_kb: int):
+    async with AsyncSessionLocal() as session:
+        run = await session.get(CrawlRun, run_id)
+        run.finished_at = datetime.now()
+        run.status = status
+        run.peak_rss_kb = peak_rss_kb
+        await session.commit()
+
+
+async def last_successful_crawls() -> dict[str, datetime]:
+    """Source name -> finish time of its latest successful crawl, from the run ledger."""
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(CrawlRunSource.source, func.max(CrawlRunSource.finished_at))
+            .where(CrawlRunSource.status == "success")
+            .group_by(CrawlRunSource.source)
+        )
+        return dict(result.all())
+
+
+async def get_data_version(session) -> tuple:
+    """
+    Stamp that changes whenever a crawler source has committed (the newest
+    crawl_run_sources id) or events changed outside a crawl, e.g. through
+    enrichment (the newest updated_at). Used to invalidate API-side caches.
+    """
+    result = await session.execute(select(
+        select(func.max(CrawlRunSource.id)).scalar_subquery(),
+        select(func.max(Event.updated_at)).scalar_subquery(),
+    ))
+    ledger_id, updated_at = result.one()
+    return ledger_id or 0, updated_at
@@ -1,35 +1,282 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy import Column, DateTime, Integer, String, Index
+from sqlalchemy.orm import declarative_base, sessionmaker, relationship
+from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Identity, Integer, JSON, String, Index, event, inspect, text
+from sqlalchemy.engine import make_url
 import os
+from datetime import datetime
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Edge API instances serve the SQLite snapshot the crawler publishes (database/snapshot.py)
+# instead of DATABASE_URL: opened read-only and immutable, so no locking and no writes
+SNAPSHOT_PATH = os.getenv("API_SNAPSHOT_PATH")
+if SNAPSHOT_PATH:
+    DATABASE_URL = f"sqlite+aiosqlite:///file:{SNAPSHOT_PATH}?mode=ro&immutable=1&uri=true"
+IS_POSTGRES = make_url(DATABASE_URL).get_backend_name() == "postgresql"
+SQLITE_MMAP_BYTES = int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
 Base = declarative_base()
 
 class Event(Base):
     __tablename__ = "music_events"
 
-    id = Column(Integer, primary_key=True)
+    # Off Postgres there is no partitioning, so id can be a real primary key (SQLite's rowid)
+    id = Column(Integer, Identity(), nullable=False, primary_key=not IS_POSTGRES)
     title = Column(String)
     start_date = Column(DateTime)
     end_date = Column(DateTime)
     location = Column(String)
     imageUrl = Column(String)
-    detailsUrl = Column(String, unique=True, nullable=True)  # Unique when present, but optional
+    # Partitioned tables can only enforce uniqueness together with the partition key,
+    # so detailsUrl is indexed and de-duplicated by the upsert in save_events_to_db
+    detailsUrl = Column(String, nullable=True)
     sourceName = Column(String)
     sourceUrl = Column(String)
+    venue_id = Column(Integer, ForeignKey("venues.id"))
+    # Set on every insert / change; deleted_at marks soft-deleted rows (see /events/changes)
+    updated_at = Column(DateTime)
+    deleted_at = Column(DateTime)
+    # Last crawl run that listed the event; the stale sweep soft-deletes the rest
+    last_seen_run_id = Column(Integer)
+    # Filled from the detail page by the optional enrichment stage
+    price = Column(String)
+    genres = Column(String)  # comma separated
+    listing_hash = Column(String)  # EventRecord.listing_hash() of the listing entry
     
     # Add indexes for common queries
     __table_args__ = (
         Index('idx_start_date', 'start_date'),
         Index('idx_source_name', 'sourceName'),
+        Index('idx_details_url', 'detailsUrl'),
+        Index('idx_event_id', 'id'),
+        Index('idx_venue_start_date', 'venue_id', 'start_date'),
+        Index('idx_updated_at', 'updated_at', 'id'),
+        # Monthly partitions are managed by database/partitions.py
+        {"postgresql_partition_by": "RANGE (start_date)"},
+    )
+    # No primary key constraint on Postgres: it would have to include the nullable start_date
+    __mapper_args__ = {"primary_key": [id]}
+
+class Venue(Base):
+    """Canonical venue; events point here through music_events.venue_id."""
+    __tablename__ = "venues"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    key = Column(String, unique=True, nullable=False)  # utils.venues.venue_key(name)
+
+    aliases = relationship("VenueAlias", back_populates="venue")
+
+
+class VenueAlias(Base):
+    """Normalized spelling -> venue. Point extra keys at one venue to merge spellings."""
+    __tablename__ = "venue_aliases"
+
+    key = Column(String, primary_key=True)
+    name = Column(String)  # first raw spelling seen for this key
+    venue_id = Column(Integer, ForeignKey("venues.id", ondelete="CASCADE"), nullable=False)
+
+    venue = relationship("Venue", back_populates="aliases")
+
+    __table_args__ = (
+        Index('idx_venue_aliases_venue', 'venue_id'),
+    )
+
+
+class EventDailyStat(Base):
+    """
+    Events per (day, source, venue), rebuilt per source by refresh_event_stats()
+    after the crawler commits, so /events/stats never aggregates music_events.
+    """
+    __tablename__ = "event_daily_stats"
+
+    day = Column(Date, primary_key=True)
+    source = Column(String, primary_key=True)
+    location = Column(String, primary_key=True)  # canonical venue name, else the raw location
+    events = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index('idx_event_daily_stats_source', 'source'),
+    )
+
+
+class CrawlRun(Base):
+    __tablename__ = "crawl_runs"
+
+    id = Column(Integer, primary_key=True)
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime)
+    status = Column(String, nullable=False, default="running")  # running | success | failed
+    peak_rss_kb = Column(Integer)
+
+    sources = relationship("CrawlRunSource", back_populates="run", lazy="selectin",
+                           order_by="CrawlRunSource.id")
+
+
+class CrawlRunSource(Base):
+    """Per-source ledger row: stage timings and counters for one crawl run."""
+    __tablename__ = "crawl_run_sources"
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey("crawl_runs.id", ondelete="CASCADE"), nullable=False)
+    source = Column(String, nullable=False)
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime)
+    status = Column(String, nullable=False)  # success | empty | failed
+    fetch_seconds = Column(Float, default=0)
+    extract_seconds = Column(Float, default=0)
+    normalize_seconds = Column(Float, default=0)
+    persist_seconds = Column(Float, default=0)
+    pages = Column(Integer, default=0)
+    events = Column(Integer, default=0)
+    inserted = Column(Integer, default=0)
+    updated = Column(Integer, default=0)
+    unchanged = Column(Integer, default=0)
+    quarantined = Column(Integer, default=0)
+    dropped = Column(Integer, default=0)
+    swept = Column(Integer, default=0)
+    error_class = Column(String)
+    error_message = Column(String)
+    rss_start_kb = Column(Integer)
+    rss_end_kb = Column(Integer)
+
+    run = relationship("CrawlRun", back_populates="sources")
+
+    __table_args__ = (
+        Index('idx_crawl_run_sources_run', 'run_id'),
+        Index('idx_crawl_run_sources_source', 'source', 'started_at'),
+    )
+
+class QuarantinedEvent(Base):
+    """A crawled event save_events_to_db rejected, kept with the reason for inspection."""
+    __tablename__ = "quarantined_events"
+
+    id = Column(Integer, primary_key=True)
+    source = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)  # the row as it would have been written
+    reason = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('idx_quarantined_events_source', 'source', 'created_at'),
     )
 
+class DetailPage(Base):
+    """
+    Enrichment cache: what a detail page yielded for a given listing entry.
+    A page is fetched again only when the listing entry (hash) changes.
+    """
+    __tablename__ = "detail_pages"
+
+    url = Column(String, primary_key=True)
+    listing_hash = Column(String, primary_key=True)
+    data = Column(JSON, nullable=False)  # {} when the page had nothing usable
+    fetched_at = Column(DateTime, nullable=False)
+
+def configure_sqlite(engine):
+    """Per-connection SQLite settings, plus explicit BEGINs so savepoints work under aiosqlite."""
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        # Stop the driver from managing transactions itself; on_begin emits BEGIN instead
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        if not SNAPSHOT_PATH:
+            # WAL: API reads don't block the crawler's writes and vice versa
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+        cursor.close()
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+
 # Create async engine and session factory
 engine = create_async_engine(DATABASE_URL, echo=False)
+if engine.dialect.name == "sqlite":
+    configure_sqlite(engine)
 AsyncSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
+# Channel the API read model (database/read_model.py) listens on
+EVENTS_CHANNEL = "music_events_changed"
+NOTIFY_PAYLOAD_LIMIT = 7000  # Postgres caps NOTIFY payloads at 8000 bytes
+
+
+async def notify_event_changes(conn, ids=None):
+    """
+    NOTIFY listeners of changed music_events ids (None: reload everything).
+    Delivered when the surrounding transaction commits; no-op off Postgres.
+    `conn` may be an AsyncSession or an AsyncConnection on `engine`.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    payloads, current = [], ""
+    for event_id in ([] if ids is None else sorted(ids)):
+        part = str(event_id)
+        if current and len(current) + len(part) + 1 > NOTIFY_PAYLOAD_LIMIT:
+            payloads.append(current)
+            current = ""
+        current = f"{current},{part}" if current else part
+    if current:
+        payloads.append(current)
+    if ids is None:
+        payloads = ["*"]
+    for payload in payloads:
+        await conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": EVENTS_CHANNEL, "payload": payload})
+
+
+_initialized = False
+
+
+def sync_schema(conn):
+    """
+    create_all plus additive upgrades for tables that already exist: columns
+    and indexes added to the models since the table was created.
+    """
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    Base.metadata.create_all(conn)
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            ddl = f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column.type.compile(conn.dialect)}'
+            for fk in column.foreign_keys:
+                ddl += f' REFERENCES {fk.column.table.name} ("{fk.column.name}")'
+            conn.execute(text(ddl))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
 # Function to create tables
 async def init_db():
+    global _initialized
+    if _initialized:
+        return
+    if SNAPSHOT_PATH:
+        # Read-only snapshot: the crawler that published it created the schema
+        _initialized = True
+        return
+
+    from database import partitions
+
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        is_postgres = conn.dialect.name == "postgresql"
+        has_legacy = is_postgres and await partitions.migrate_legacy_table(conn)
+        await conn.run_sync(sync_schema)
+        if is_postgres:
+            await partitions.ensure_partitions(conn)
+            if has_legacy:
+                await partitions.copy_legacy_rows(conn)
+        # Rows written before updated_at existed enter the change feed once
+        await conn.execute(
+            text("UPDATE music_events SET updated_at = :now WHERE updated_at IS NULL"), {"now": datetime.now()}
+        )
+    _initialized = True
@@ -0,0 +1,169 @@
+"""
+Monthly range partitioning of music_events by start_date (PostgreSQL only).
+
+    music_events                 partitioned parent, RANGE (start_date)
+    music_events_YYYY_MM         one partition per month
+    music_events_default         NULL start_date (clubber.gr) and months not created yet
+
+maintain_partitions() creates partitions PARTITION_PREMAKE_MONTHS ahead and
+detaches (or drops) partitions older than EVENT_RETENTION_MONTHS. Detached
+partitions are renamed music_events_archive_YYYY_MM and keep their data.
+
+Run it standalone with `python -m database.partitions`.
+"""
+import os
+import re
+import asyncio
+from datetime import date
+
+from sqlalchemy import text
+
+from utils.helper import LOGGER
+
+RETENTION_MONTHS = int(os.getenv("EVENT_RETENTION_MONTHS", "6"))
+PREMAKE_MONTHS = int(os.getenv("EVENT_PARTITION_PREMAKE_MONTHS", "3"))
+ARCHIVE_MODE = os.getenv("EVENT_ARCHIVE_MODE", "detach")  # detach | drop
+
+PARENT = "music_events"
+DEFAULT_PARTITION = "music_events_default"
+PARTITION_RE = re.compile(r"^music_events_(\d{4})_(\d{2})$")
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_{month:%Y_%m}"
+
+
+async def list_partitions(conn) -> dict[date, str]:
+    result = await conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = :parent
+    """), {"parent": PARENT})
+    partitions = {}
+    for (name,) in result:
+        match = PARTITION_RE.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+async def migrate_legacy_table(conn) -> bool:
+    """
+    Rename a pre-partitioning music_events heap out of the way so create_all
+    can build the partitioned parent. Returns True when a legacy table is
+    waiting to be copied by copy_legacy_rows().
+    """
+    relkind = (await conn.execute(text(
+        "SELECT relkind::text FROM pg_class WHERE relname = :name AND relkind IN ('r', 'p')"
+    ), {"name": PARENT})).scalar()
+    if relkind == "r":
+        LOGGER.info("🔀 Converting music_events to a partitioned table")
+        await conn.execute(text(f"ALTER TABLE {PARENT} RENAME TO {PARENT}_legacy"))
+        # Index names are schema-global; free them for the new parent
+        await conn.execute(text("DROP INDEX IF EXISTS idx_start_date, idx_source_name"))
+        await conn.execute(text(f'ALTER TABLE {PARENT}_legacy DROP CONSTRAINT IF EXISTS "{PARENT}_detailsUrl_key"'))
+    legacy = (await conn.execute(text("SELECT to_regclass(:name)"), {"name": f"{PARENT}_legacy"})).scalar()
+    return legacy is not None
+
+
+async def copy_legacy_rows(conn):
+    months = await conn.execute(text(
+        f"SELECT DISTINCT date_trunc('month', start_date)::date FROM {PARENT}_legacy WHERE start_date IS NOT NULL"
+    ))
+    existing = await list_partitions(conn)
+    for (month,) in months:
+        if month not in existing:
+            await create_month_partition(conn, month)
+    columns = ", ".join(
+        f'"{c}"' for c in ("id", "title", "start_date", "end_date", "location",
+                           "imageUrl", "detailsUrl", "sourceName", "sourceUrl")
+    )
+    await conn.execute(text(
+        f"INSERT INTO {PARENT} ({columns}) OVERRIDING SYSTEM VALUE SELECT {columns} FROM {PARENT}_legacy"
+    ))
+    await conn.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{PARENT}', 'id'), coalesce(max(id), 0) + 1, false) FROM {PARENT}"
+    ))
+    await conn.execute(text(f"DROP TABLE {PARENT}_legacy"))
+    LOGGER.info("✅ Copied legacy music_events rows into partitions")
+
+
+async def create_month_partition(conn, month: date):
+    """
+    Create the partition for `month`, first moving any rows for that month
+    out of the default partition (Postgres refuses to create a partition
+    whose range overlaps rows still sitting in the default one).
+    """
+    lo, hi = month, add_months(month, 1)
+    name = partition_name(month)
+    bounds = {"lo": lo, "hi": hi}
+
+    await conn.execute(text(f"CREATE TEMP TABLE _moving (LIKE {PARENT}) ON COMMIT DROP"))
+    await conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE start_date >= :lo AND start_date < :hi RETURNING *
+        )
+        INSERT INTO _moving SELECT * FROM moved
+    """), bounds)
+    await conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {PARENT} FOR VALUES FROM ('{lo}') TO ('{hi}')"
+    ))
+    await conn.execute(text(f"INSERT INTO {PARENT} OVERRIDING SYSTEM VALUE SELECT * FROM _moving"))
+    await conn.execute(text("DROP TABLE _moving"))
+    LOGGER.info(f"🧱 Created partition {name}")
+
+
+async def ensure_partitions(conn, first: date | None = None, last: date | None = None):
+    """Make sure the default partition and every month in [first, last] exist."""
+    today = date.today().replace(day=1)
+    first = first or add_months(today, -RETENTION_MONTHS)
+    last = last or add_months(today, PREMAKE_MONTHS)
+
+    await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT"))
+    existing = await list_partitions(conn)
+    month = first
+    while month <= last:
+        if month not in existing:
+            await create_month_partition(conn, month)
+        month = add_months(month, 1)
+
+
+async def archive_old_partitions(conn, retention_months: int = RETENTION_MONTHS):
+    from database.db import notify_event_changes
+
+    cutoff = add_months(date.today().replace(day=1), -retention_months)
+    for month, name in sorted((await list_partitions(conn)).items()):
+        if month >= cutoff:
+            continue
+        await notify_event_changes(conn)
+        await conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+        is_empty = (await conn.execute(text(f"SELECT NOT EXISTS (SELECT 1 FROM {name})"))).scalar()
+        if ARCHIVE_MODE == "drop" or is_empty:
+            await conn.execute(text(f"DROP TABLE {name}"))
+            LOGGER.info(f"🗑️ Dropped partition {name}")
+        else:
+            archived = f"{PARENT}_archive_{month:%Y_%m}"
+            await conn.execute(text(f"ALTER TABLE {name} RENAME TO {archived}"))
+            LOGGER.info(f"📦 Archived partition {name} as {archived}")
+
+
+async def maintain_partitions():
+    """Create upcoming partitions and archive the ones past retention."""
+    from database.db import engine, init_db
+
+    if engine.dialect.name != "postgresql":
+        return
+    await init_db()
+    async with engine.begin() as conn:
+        await ensure_partitions(conn)
+        await archive_old_partitions(conn)
+
+
+if __name__ == "__main__":
+    asyncio.run(maintain_partitions())
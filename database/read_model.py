@@ -0,0 +1,192 @@
+"""
+In-memory copy of music_events for the API process.
+
+Events are kept sorted by (start_date, id) with secondary id sets per source
+and venue, so /events range queries are a couple of bisects instead of a DB
+round trip. The crawler's write path NOTIFYs the ids it changed on
+EVENTS_CHANNEL; the listener re-reads only those rows.
+"""
+import os
+import asyncio
+from bisect import bisect_left, insort
+from datetime import datetime
+
+from sqlalchemy.future import select
+
+from database.db import AsyncSessionLocal, Event, EVENTS_CHANNEL, engine
+from utils.helper import LOGGER
+
+READ_MODEL_ENABLED = os.getenv("API_READ_MODEL", "on").lower() not in ("0", "off", "false")
+RECONNECT_SECONDS = 5
+
+# Undated events sort after every dated one
+UNDATED = 1
+DATED = 0
+
+
+class CachedEvent:
+    __slots__ = ("id", "title", "start_date", "end_date", "location", "imageUrl",
+                 "detailsUrl", "sourceName", "sourceUrl", "venue_id", "price", "genres")
+
+    def __init__(self, row):
+        for name in self.__slots__:
+            setattr(self, name, getattr(row, name))
+
+    @property
+    def sort_key(self):
+        if self.start_date is None:
+            return (UNDATED, datetime.min, self.id)
+        return (DATED, self.start_date, self.id)
+
+
+class EventReadModel:
+    def __init__(self):
+        self.events: dict[int, CachedEvent] = {}
+        self.keys: list[tuple] = []
+        self.by_source: dict[str, set[int]] = {}
+        self.by_venue: dict[int, set[int]] = {}
+        self.ready = False
+        self._task: asyncio.Task | None = None
+
+    # --- index maintenance -------------------------------------------------
+
+    def _add(self, event: CachedEvent):
+        self.events[event.id] = event
+        insort(self.keys, event.sort_key)
+        self.by_source.setdefault(event.sourceName, set()).add(event.id)
+        if event.venue_id is not None:
+            self.by_venue.setdefault(event.venue_id, set()).add(event.id)
+
+    def _remove(self, event_id: int):
+        event = self.events.pop(event_id, None)
+        if event is None:
+            return
+        key = event.sort_key
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            del self.keys[index]
+        self.by_source.get(event.sourceName, set()).discard(event_id)
+        if event.venue_id is not None:
+            self.by_venue.get(event.venue_id, set()).discard(event_id)
+
+    def replace_all(self, rows):
+        self.events.clear()
+        self.by_source.clear()
+        self.by_venue.clear()
+        events = [CachedEvent(row) for row in rows]
+        self.keys = sorted(event.sort_key for event in events)
+        for event in events:
+            self.events[event.id] = event
+            self.by_source.setdefault(event.sourceName, set()).add(event.id)
+            if event.venue_id is not None:
+                self.by_venue.setdefault(event.venue_id, set()).add(event.id)
+
+    def apply(self, ids: set[int], rows):
+        """Apply a delta: `rows` are the current versions of `ids`; missing ids were deleted."""
+        for event_id in ids:
+            self._remove(event_id)
+        for row in rows:
+            self._add(CachedEvent(row))
+
+    # --- queries -------------------------------------------------------------
+
+    def query(self, source: str | None = None, venue: int | None = None,
+              start: datetime | None = None, end: datetime | None = None) -> list[CachedEvent]:
+        """Same semantics as the SQL filters: a date bound excludes undated events."""
+        lo, hi = 0, len(self.keys)
+        if start is not None or end is not None:
+            if start is not None:
+                lo = bisect_left(self.keys, (DATED, start))
+            hi = bisect_left(self.keys, (DATED, end)) if end is not None else bisect_left(self.keys, (UNDATED,))
+
+        if lo >= hi:
+            return []
+
+        wanted = None
+        if source:
+            wanted = self.by_source.get(source, set())
+        if venue is not None:
+            venue_ids = self.by_venue.get(venue, set())
+            wanted = venue_ids if wanted is None else wanted & venue_ids
+
+        if wanted is not None and len(wanted) < hi - lo:
+            # Few matches: sort the candidates instead of walking the whole range
+            keys = sorted(self.events[i].sort_key for i in wanted)
+            return [
+                self.events[key[2]] for key in keys
+                if key >= self.keys[lo] and (hi >= len(self.keys) or key < self.keys[hi])
+            ]
+        return [
+            self.events[key[2]] for key in self.keys[lo:hi]
+            if wanted is None or key[2] in wanted
+        ]
+
+    # --- syncing with Postgres -------------------------------------------------
+
+    async def reload(self):
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(Event).where(Event.deleted_at.is_(None)))
+            self.replace_all(result.scalars().all())
+        self.ready = True
+        LOGGER.info(f"📚 Read model loaded {len(self.events)} events")
+
+    async def refresh_ids(self, ids: set[int]):
+        async with AsyncSessionLocal() as session:
+            # Soft-deleted rows are left out, so apply() drops them from the index
+            result = await session.execute(select(Event).where(Event.id.in_(ids), Event.deleted_at.is_(None)))
+            self.apply(ids, result.scalars().all())
+        LOGGER.info(f"📚 Read model applied {len(ids)} changed events")
+
+    async def _listen_forever(self):
+        import asyncpg
+
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn)
+                pending: asyncio.Queue[set[int]] = asyncio.Queue()
+
+                def on_notify(connection, pid, channel, payload):
+                    # "*" means too much changed for a delta (e.g. a partition was archived)
+                    pending.put_nowait(None if payload == "*" else {int(i) for i in payload.split(",") if i})
+
+                # Subscribe before the full load so no change can slip in between
+                await conn.add_listener(EVENTS_CHANNEL, on_notify)
+                await self.reload()
+                while not conn.is_closed():
+                    try:
+                        ids = await asyncio.wait_for(pending.get(), timeout=RECONNECT_SECONDS)
+                    except asyncio.TimeoutError:
+                        continue
+                    batch = [ids]
+                    while not pending.empty():
+                        batch.append(pending.get_nowait())
+                    if None in batch:
+                        await self.reload()
+                    else:
+                        await self.refresh_ids(set().union(*batch))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LOGGER.error(f"❌ Read model listener failed: {e}")
+            finally:
+                self.ready = False
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+    def start(self):
+        if READ_MODEL_ENABLED and engine.dialect.name == "postgresql":
+            self._task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+READ_MODEL = EventReadModel()
@@ -0,0 +1,109 @@
+"""
+Compact SQLite snapshot of everything the API reads, for edge API instances.
+
+After each crawl run main.py copies the served tables from the main database
+into a fresh SQLite file, VACUUMs it and renames it over SQLITE_SNAPSHOT_PATH
+in one step. API instances started with API_SNAPSHOT_PATH open that file
+read-only, immutable and memory-mapped (see database/db.py), so their reads
+never leave the host. SNAPSHOT watches for a newly published file and
+reopens the connections.
+"""
+import os
+import asyncio
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.future import select
+
+from database.db import (
+    Base, Event, Venue, EventDailyStat, CrawlRun, CrawlRunSource, IS_POSTGRES, SNAPSHOT_PATH, engine,
+)
+from utils.helper import LOGGER
+
+SNAPSHOT_PUBLISH_PATH = os.getenv("SQLITE_SNAPSHOT_PATH")
+SNAPSHOT_POLL_SECONDS = float(os.getenv("SNAPSHOT_POLL_SECONDS", "10"))
+COPY_CHUNK = 5000
+
+# The tables behind the API's endpoints; soft-deleted events stay for /events/changes
+SNAPSHOT_TABLES = [model.__table__ for model in (Venue, Event, EventDailyStat, CrawlRun, CrawlRunSource)]
+
+
+async def publish_snapshot(path: str = SNAPSHOT_PUBLISH_PATH) -> int:
+    """Write the snapshot next to `path`, then swap it in atomically. Returns the events copied."""
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)  # left behind by an interrupted run
+
+    target = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}")
+    copied = dict.fromkeys((table.name for table in SNAPSHOT_TABLES), 0)
+    try:
+        async with target.begin() as dst:
+            await dst.run_sync(Base.metadata.create_all, tables=SNAPSHOT_TABLES)
+            # One snapshot of the source, so the tables are consistent with each other.
+            # Postgres defaults to READ COMMITTED, where each SELECT sees the latest commit;
+            # SQLite's transactions already read one snapshot (and it has no REPEATABLE READ).
+            isolation = "REPEATABLE READ" if IS_POSTGRES else "SERIALIZABLE"
+            async with engine.connect() as src:
+                src = await src.execution_options(isolation_level=isolation)
+                async with src.begin():
+                    for table in SNAPSHOT_TABLES:
+                        result = await src.stream(select(table))
+                        async for rows in result.mappings().partitions(COPY_CHUNK):
+                            await dst.execute(insert(table), [dict(row) for row in rows])
+                            copied[table.name] += len(rows)
+        async with target.connect() as dst:
+            dst = await dst.execution_options(isolation_level="AUTOCOMMIT")
+            await dst.exec_driver_sql("ANALYZE")
+            await dst.exec_driver_sql("VACUUM")
+    finally:
+        await target.dispose()
+
+    # Readers keep the old file open until they reopen; new opens get the new one
+    os.replace(tmp_path, path)
+    LOGGER.info(f"📦 Published snapshot {path} ({os.path.getsize(path) // 1024} KiB, "
+                f"{copied[Event.__tablename__]} events)")
+    return copied[Event.__tablename__]
+
+
+class SnapshotWatcher:
+    """Reopens the API's connections when the crawler publishes a new snapshot."""
+
+    def __init__(self):
+        self.stamp = None
+        self._task: asyncio.Task | None = None
+
+    def current_stamp(self):
+        try:
+            stat = os.stat(SNAPSHOT_PATH)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    async def _watch_forever(self):
+        while True:
+            await asyncio.sleep(SNAPSHOT_POLL_SECONDS)
+            stamp = self.current_stamp()
+            if stamp is None or stamp == self.stamp:
+                continue
+            self.stamp = stamp
+            # Pooled connections still point at the old file; queries in flight finish on it
+            await engine.dispose()
+            LOGGER.info(f"📦 Switched to the new snapshot {SNAPSHOT_PATH}")
+
+    def start(self):
+        if SNAPSHOT_PATH:
+            self.stamp = self.current_stamp()
+            if self.stamp is None:
+                LOGGER.warning(f"⚠️ Snapshot {SNAPSHOT_PATH} not published yet")
+            self._task = asyncio.create_task(self._watch_forever())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+SNAPSHOT = SnapshotWatcher()
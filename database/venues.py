@@ -0,0 +1,45 @@
+from sqlalchemy.future import select
+
+from database.db import Venue, VenueAlias, AsyncSessionLocal
+from utils.helper import LOGGER
+from utils.venues import venue_key, display_name
+
+# venue_key -> venue id, shared by every batch in the crawler process
+VENUE_INDEX: dict[str, int] = {}
+_loaded = False
+
+
+async def resolve_venue_ids(locations) -> dict[str, int]:
+    """
+    Map raw location strings to venue ids, creating a venue (and its alias)
+    for every key not seen before. Lookups after the first call are served
+    from the in-memory index. New venues are committed in their own session
+    so the index never points at a rolled-back row.
+    """
+    global _loaded
+    pending = {}
+    for location in set(locations):
+        key = venue_key(location)
+        if key is not None:
+            pending[location] = key
+
+    if not _loaded or any(key not in VENUE_INDEX for key in pending.values()):
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(VenueAlias.key, VenueAlias.venue_id))
+            VENUE_INDEX.update(result.all())
+            _loaded = True
+
+            created = {}
+            for location, key in pending.items():
+                if key in VENUE_INDEX or key in created:
+                    continue
+                venue = Venue(name=display_name(location), key=key)
+                session.add(venue)
+                await session.flush()
+                session.add(VenueAlias(key=key, name=venue.name, venue_id=venue.id))
+                created[key] = venue.id
+                LOGGER.info(f"🏟️ New venue #{venue.id}: {venue.name}")
+            await session.commit()
+            VENUE_INDEX.update(created)
+
+    return {location: VENUE_INDEX[key] for location, key in pending.items()}
@@ -0,0 +1,406 @@
+"""
+Load test for the API, fully offline.
+
+    python loadtest.py seed --rows 100000 --reset   # synthetic events into DATABASE_URL
+    python loadtest.py run --duration 30 --concurrency 20 [--rate 200] [--mix events_window=3,stats=1]
+    python loadtest.py compare loadtest-results/a.json loadtest-results/b.json
+
+`seed` fills the database at DATABASE_URL (a local Postgres or SQLite file)
+with events shaped like crawler output. `run` drives the FastAPI app in
+api.py in-process through httpx's ASGI transport, with no network and no
+server, and reports throughput, p50/p95/p99 latency and the process RSS.
+Each run is saved as JSON under LOADTEST_RESULTS_DIR, tagged with the git
+commit, so `compare` can put two commits side by side.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import delete, func, insert, text
+from sqlalchemy.future import select
+
+from crawler.registry import CRAWLERS
+from database.crud import refresh_event_stats
+from database.db import Event, EventDailyStat, Venue, VenueAlias, engine, init_db
+from utils.helper import LOGGER
+from utils.metrics import current_rss_kb, peak_rss_kb
+from utils.venues import venue_key
+
+RESULTS_DIR = os.getenv("LOADTEST_RESULTS_DIR", "loadtest-results")
+SEED_CHUNK = 5000
+
+VENUES = [
+    "Gazarte", "Fuzz Club", "Gagarin 205", "Piraeus 117 Academy", "Half Note Jazz Club", "Κύτταρο",
+    "Temple", "Six D.O.G.S", "Ωδείο Ηρώδου Αττικού", "Christmas Theater", "Μέγαρο Μουσικής Αθηνών",
+    "Stavros Niarchos Foundation Cultural Center", "Death Disco", "Ιλίσια", "Tiki Bar", "Alte Bar",
+    "Hlektra Palace", "Vox", "Barrio Bar", "Faust",
+]
+WORDS = [
+    "Live", "Night", "Jazz", "Quartet", "Tribute", "Session", "Rebetiko", "Orchestra", "Electronic",
+    "Unplugged", "Festival", "Tour", "Ensemble", "Acoustic", "Soul", "Party", "Trio", "Σκηνή", "Βραδιά",
+]
+
+# Scenario name -> default weight. `events_all` (every event in one response)
+# is opt-in: at large row counts it dwarfs everything else.
+DEFAULT_MIX = {
+    "events_window": 40, "events_source": 15, "events_all": 0, "venue_events": 15,
+    "stats": 10, "changes": 10, "ics": 5, "venues": 5,
+}
+
+
+# --- seeding -------------------------------------------------------------------
+
+def synthetic_events(rows: int, rng: random.Random, venues: list[tuple[int, str]], now: datetime):
+    """Rows shaped like save_events_to_db output, spread over the retention window."""
+    sources = [spec.name for spec in CRAWLERS]
+    for event_id in range(1, rows + 1):
+        source = rng.choice(sources)
+        venue_id, venue = rng.choice(venues)
+        # Crawlers spell venues in several ways; they resolve to one venue_id
+        location = rng.choice((venue, venue.upper(), f"{venue} - Αθήνα"))
+        start = (now + timedelta(days=rng.randint(-90, 180))).replace(
+            hour=rng.choice((19, 20, 21, 22, 23)), minute=rng.choice((0, 30)), second=0, microsecond=0)
+        yield {
+            "id": event_id,
+            "title": " ".join(rng.sample(WORDS, rng.randint(2, 5))),
+            "start_date": start,
+            "end_date": start if rng.random() < 0.7 else start + timedelta(hours=rng.randint(2, 6)),
+            "location": location,
+            "imageUrl": f"https://{source}/images/{event_id}.jpg" if rng.random() < 0.8 else None,
+            "detailsUrl": f"https://{source}/event/{event_id}",
+            "sourceName": source,
+            "sourceUrl": f"https://{source}",
+            "venue_id": venue_id,
+            "updated_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 30)),
+            "deleted_at": now if rng.random() < 0.02 else None,
+            "last_seen_run_id": None,
+        }
+
+
+async def seed(rows: int, reset: bool, seed_value: int):
+    await init_db()
+    async with engine.begin() as conn:
+        existing = (await conn.execute(select(func.count()).select_from(Event))).scalar()
+        if existing and not reset:
+            sys.exit(f"music_events already holds {existing} rows; pass --reset to replace them")
+        for model in (Event, EventDailyStat, VenueAlias, Venue):
+            await conn.execute(delete(model))
+
+    rng = random.Random(seed_value)
+    now = datetime.now()
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        venues = list(enumerate(VENUES, start=1))
+        await conn.execute(insert(Venue), [{"id": i, "name": name, "key": venue_key(name)} for i, name in venues])
+        # resolve_venue_ids looks venues up through their aliases
+        await conn.execute(insert(VenueAlias), [{"key": venue_key(name), "name": name, "venue_id": i} for i, name in venues])
+        chunk = []
+        # Explicit ids: the Identity column has no primary key to lean on outside Postgres
+        for row in synthetic_events(rows, rng, venues, now):
+            chunk.append(row)
+            if len(chunk) == SEED_CHUNK:
+                await conn.execute(insert(Event), chunk)
+                chunk = []
+        if chunk:
+            await conn.execute(insert(Event), chunk)
+        if conn.dialect.name == "postgresql":
+            # Later crawler inserts must not collide with the seeded ids
+            for table, column in (("music_events", "id"), ("venues", "id")):
+                await conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), (SELECT max({column}) FROM {table}))"
+                ))
+    await refresh_event_stats([spec.name for spec in CRAWLERS])
+    LOGGER.info(f"🌱 Seeded {rows} events into {engine.dialect.name} in {time.perf_counter() - started:.1f}s")
+    await engine.dispose()
+
+
+# --- load --------------------------------------------------------------------------
+
+def parse_mix(value: str | None) -> dict[str, int]:
+    if not value:
+        return {name: weight for name, weight in DEFAULT_MIX.items() if weight}
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r} (choose from {', '.join(DEFAULT_MIX)})")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+async def dataset_context(api) -> dict:
+    """What the scenarios need to build realistic queries against the seeded data."""
+    async with engine.connect() as conn:
+        live = Event.deleted_at.is_(None)
+        first, last, count = (await conn.execute(
+            select(func.min(Event.start_date), func.max(Event.start_date), func.count()).where(live)
+        )).one()
+        sources = (await conn.execute(select(Event.sourceName).where(live).distinct())).scalars().all()
+        venue_ids = (await conn.execute(select(Venue.id))).scalars().all()
+    if not count:
+        sys.exit("music_events is empty; run `python loadtest.py seed` first")
+    return {
+        "first": first, "last": last, "rows": count, "sources": sources, "venue_ids": venue_ids,
+        # Clients polling every few minutes; a day back keeps a full page of changes
+        "change_token": api.encode_change_token(datetime.now() - timedelta(days=1), 0),
+    }
+
+
+def random_window(rng: random.Random, ctx: dict, days: int) -> dict:
+    span = max(0, (ctx["last"] - ctx["first"]).days - days)
+    start = (ctx["first"] + timedelta(days=rng.randint(0, span))).date()
+    return {"start": start.isoformat(), "end": (start + timedelta(days=days)).isoformat()}
+
+
+def build_request(name: str, rng: random.Random, ctx: dict) -> tuple[str, dict]:
+    if name == "events_window":
+        return "/events", random_window(rng, ctx, 7)
+    if name == "events_source":
+        return "/events", {"source": rng.choice(ctx["sources"]), **random_window(rng, ctx, 30)}
+    if name == "events_all":
+        return "/events", {}
+    if name == "venue_events":
+        return f"/venues/{rng.choice(ctx['venue_ids'])}/events", random_window(rng, ctx, 30)
+    if name == "stats":
+        return "/events/stats", random_window(rng, ctx, 30)
+    if name == "changes":
+        return "/events/changes", {"since": ctx["change_token"]}
+    if name == "ics":
+        return "/events.ics", {"source": rng.choice(ctx["sources"])}
+    return "/venues", {}
+
+
+def percentiles(latencies: list[float]) -> dict:
+    if not latencies:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {
+        "p50": round(cuts[49] * 1000, 2), "p95": round(cuts[94] * 1000, 2), "p99": round(cuts[98] * 1000, 2),
+        "mean": round(statistics.fmean(latencies) * 1000, 2), "max": round(max(latencies) * 1000, 2),
+    }
+
+
+async def load(args) -> dict:
+    # Imported here so `seed` and `compare` don't build the app
+    import api
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # one INFO line per request otherwise
+
+    mix = args.mix
+    names, weights = list(mix), list(mix.values())
+    rng = random.Random(args.seed)
+    samples: dict[str, list[float]] = {name: [] for name in names}
+    errors: dict[str, int] = dict.fromkeys(names, 0)
+    received = 0
+    rss_max = 0
+
+    async with api.app.router.lifespan_context(api.app):
+        if api.READ_MODEL._task is not None:
+            while not api.READ_MODEL.ready:
+                await asyncio.sleep(0.1)
+        ctx = await dataset_context(api)
+        rss_start = current_rss_kb()
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+
+            async def one(name: str, path: str, params: dict, scheduled: float, record: bool):
+                nonlocal received
+                try:
+                    res = await client.get(path, params=params)
+                    failed = res.status_code >= 400
+                    received += len(res.content) if record else 0
+                except Exception as e:
+                    LOGGER.warning(f"⚠️ {path} failed: {type(e).__name__}: {e}")
+                    failed = True
+                if record:
+                    # Measured from the scheduled send time, so a backed-up server shows up as latency
+                    samples[name].append(time.perf_counter() - scheduled)
+                    errors[name] += failed
+
+            def pick() -> tuple[str, str, dict]:
+                name = rng.choices(names, weights)[0]
+                return (name, *build_request(name, rng, ctx))
+
+            for _ in range(args.warmup):
+                await one(*pick(), time.perf_counter(), record=False)
+
+            async def sample_rss():
+                nonlocal rss_max
+                while True:
+                    rss_max = max(rss_max, current_rss_kb())
+                    await asyncio.sleep(0.25)
+
+            sampler = asyncio.create_task(sample_rss())
+            started = time.perf_counter()
+            deadline = started + args.duration
+            if args.rate:
+                # Open loop: requests go out on schedule whether or not earlier ones finished
+                slots = asyncio.Semaphore(args.concurrency)
+
+                async def scheduled_request(request, scheduled):
+                    async with slots:
+                        await one(*request, scheduled, record=True)
+
+                tasks, sent = [], 0
+                while (scheduled := started + sent / args.rate) < deadline:
+                    await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                    tasks.append(asyncio.create_task(scheduled_request(pick(), scheduled)))
+                    sent += 1
+                await asyncio.gather(*tasks)
+            else:
+                # Closed loop: `concurrency` clients each send their next request on a response
+                async def client_loop():
+                    while time.perf_counter() < deadline:
+                        await one(*pick(), time.perf_counter(), record=True)
+
+                await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+            sampler.cancel()
+        rss_end = current_rss_kb()
+
+    latencies = [latency for values in samples.values() for latency in values]
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors.values()),
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "received_mb": round(received / 2 ** 20, 1),
+        "latency_ms": percentiles(latencies),
+        "scenarios": {
+            name: {"requests": len(samples[name]), "errors": errors[name], **percentiles(samples[name])}
+            for name in names
+        },
+        "memory_kb": {"start": rss_start, "end": rss_end, "max": max(rss_max, rss_end), "peak": peak_rss_kb()},
+        "dataset": {"backend": engine.dialect.name, "rows": ctx["rows"], "read_model": api.READ_MODEL.ready},
+    }
+
+
+def git_revision() -> dict:
+    def git(*cmd):
+        try:
+            return subprocess.run(["git", *cmd], capture_output=True, text=True, check=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(status)}
+
+
+async def run(args):
+    if args.quiet_app:
+        # The CORS middleware prints per request; keep it (it is part of the cost) off the terminal
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            result = await load(args)
+    else:
+        result = await load(args)
+    await engine.dispose()
+
+    created = datetime.now()
+    report = {
+        "label": args.label,
+        **git_revision(),
+        "created_at": created.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {
+            "duration": args.duration, "concurrency": args.concurrency, "rate": args.rate,
+            "warmup": args.warmup, "seed": args.seed, "mix": args.mix,
+        },
+        **result,
+    }
+    print_report(report)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{created:%Y%m%d-%H%M%S}-{report['commit'] or 'nogit'}"
+                                     f"{'-' + args.label if args.label else ''}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    LOGGER.info(f"💾 Results saved to {path}")
+
+
+# --- reporting -------------------------------------------------------------------
+
+def print_report(report: dict):
+    data, memory = report["dataset"], report["memory_kb"]
+    print(f"\n{report['commit']}{' (dirty)' if report['dirty'] else ''} | {data['backend']}, {data['rows']} live rows"
+          f"{', read model' if data['read_model'] else ''}")
+    print(f"{report['requests']} requests in {report['elapsed_seconds']}s: {report['throughput_rps']} req/s, "
+          f"{report['errors']} errors, {report['received_mb']} MB received")
+    print(f"RSS {memory['start'] // 1024} MB at start, {memory['max'] // 1024} MB max, {memory['end'] // 1024} MB at end")
+    print(f"\n{'scenario':<16}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in [("all", {**report["latency_ms"], "requests": report["requests"], "errors": report["errors"]}),
+                        *report["scenarios"].items()]:
+        print(f"{name:<16}{stats['requests']:>10}{stats['errors']:>8}"
+              + "".join(f"{stats[p] if stats[p] is not None else '-':>10}" for p in ("p50", "p95", "p99")))
+
+
+def compare(base_path: str, head_path: str):
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(head_path) as f:
+        head = json.load(f)
+
+    def change(old, new) -> str:
+        if old is None or new is None:
+            return "-"
+        return f"{old} → {new} ({(new - old) / old * 100:+.0f}%)" if old else f"{old} → {new}"
+
+    print(f"{base['commit']} ({base['created_at']}) → {head['commit']} ({head['created_at']})")
+    if base["config"] != head["config"] or base["dataset"] != head["dataset"]:
+        print("⚠️ The runs used different settings or datasets")
+    print(f"throughput req/s  {change(base['throughput_rps'], head['throughput_rps'])}")
+    print(f"max RSS KiB       {change(base['memory_kb']['max'], head['memory_kb']['max'])}")
+    for name in ["all", *head["scenarios"]]:
+        old = base["latency_ms"] if name == "all" else base["scenarios"].get(name)
+        new = head["latency_ms"] if name == "all" else head["scenarios"][name]
+        if old is None:
+            continue
+        print(f"{name:<16}" + "  ".join(f"{p} {change(old[p], new[p])}" for p in ("p50", "p95", "p99")))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Seed a local database and load test the API offline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_cmd = commands.add_parser("seed", help="fill DATABASE_URL with synthetic events")
+    seed_cmd.add_argument("--rows", type=int, default=10_000, help="number of events (default 10000)")
+    seed_cmd.add_argument("--reset", action="store_true", help="replace the events and venues already there")
+    seed_cmd.add_argument("--seed", type=int, default=42, help="random seed for the synthetic data")
+
+    run_cmd = commands.add_parser("run", help="drive the API and save the results")
+    run_cmd.add_argument("--duration", type=float, default=30, help="seconds to measure (default 30)")
+    run_cmd.add_argument("--concurrency", type=int, default=20,
+                         help="concurrent clients, or the cap on in-flight requests with --rate (default 20)")
+    run_cmd.add_argument("--rate", type=float, help="target requests per second (open loop) instead of closed loop")
+    run_cmd.add_argument("--mix", type=parse_mix, default=parse_mix(None),
+                         help=f"scenario weights, e.g. events_window=3,stats=1 (scenarios: {', '.join(DEFAULT_MIX)})")
+    run_cmd.add_argument("--warmup", type=int, default=50, help="unmeasured requests sent first (default 50)")
+    run_cmd.add_argument("--seed", type=int, default=42, help="random seed for the request sequence")
+    run_cmd.add_argument("--label", help="tag added to the results file name")
+    run_cmd.add_argument("--show-app-output", dest="quiet_app", action="store_false",
+                         help="let the app's per-request prints through")
+
+    compare_cmd = commands.add_parser("compare", help="compare two saved results")
+    compare_cmd.add_argument("base")
+    compare_cmd.add_argument("head")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "seed":
+        asyncio.run(seed(args.rows, args.reset, args.seed))
+    elif args.command == "run":
+        asyncio.run(run(args))
+    else:
+        compare(args.base, args.head)
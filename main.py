@@ -1,58 +1,165 @@
+import argparse
 import asyncio
 import sys
 import os
+import time
+from datetime import datetime
 
-from crawler.athinorama import crawl_athinorama
-from crawler.iereies_tis_nychtas import crawl_iereies
-from crawler.aptaliko import crawl_aptaliko
-from crawler.clubber import crawl_clubber
-from crawler.more_com import crawl_more_com
-from crawler.ticketmaster import crawl_ticketmaster
-from crawler.ticketservices import crawl_ticketservices
-from database.crud import save_events_to_db
+from crawler.registry import CRAWLERS, CrawlerSpec, select_crawlers
+from database.db import engine
+from database.partitions import maintain_partitions
+from database.snapshot import SNAPSHOT_PUBLISH_PATH, publish_snapshot
+from database.crud import (
+    save_events_to_db, refresh_event_stats, sweep_stale_events, start_crawl_run, record_crawl_source,
+    finish_crawl_run, last_successful_crawls,
+)
 from utils.helper import print_serialized, LOGGER
+from utils.metrics import SourceStats, CURRENT_STATS, stage, current_rss_kb, peak_rss_kb
+from utils.pipeline import run_pipeline
+from utils.replay import ARCHIVE, REPLAY_MODE
+
+async def run_crawler(spec: CrawlerSpec, run_id: int) -> bool:
+    """Run a single crawler, print and save results, and record it in the run ledger."""
+    crawler_func = spec.load()
+    stats = SourceStats(source=spec.name, rss_start_kb=current_rss_kb())
+    token = CURRENT_STATS.set(stats)
+    started_at = datetime.now()
+    status = "success"
+    source_names = set()
+    seen_until = None  # latest start_date listed in this run (undated events aside)
+
+    async def write_batch(batch):
+        nonlocal seen_until
+        print_serialized([e.as_dict() for e in batch])
+        with stage("persist"):
+            counts = await save_events_to_db(batch, run_id)
+        source_names.update(e.sourceName for e in batch)
+        latest = max((e.start_date for e in batch if e.start_date is not None), default=None)
+        if latest is not None:
+            seen_until = latest if seen_until is None else max(seen_until, latest)
+        stats.events += len(batch)
+        stats.inserted += counts["inserted"]
+        stats.updated += counts["updated"]
+        stats.unchanged += counts["unchanged"]
+        stats.quarantined += counts["quarantined"]
 
-# Registry of all crawlers
-CRAWLERS = [
-    crawl_iereies,
-    crawl_aptaliko,
-    crawl_athinorama,
-    crawl_clubber,
-    crawl_more_com,
-    crawl_ticketmaster,
-    crawl_ticketservices
-]
-
-async def run_crawler(crawler_func):
-    """Run a single crawler, print and save results."""
     try:
-        events = await crawler_func()
-        if not events:
-            LOGGER.warning(f"No events returned from {crawler_func.__name__}")
-            return
-        print_serialized(events)
-        await save_events_to_db(events)
-        LOGGER.info(f"Saved {len(events)} events from {crawler_func.__name__}")
+        # Crawlers are async generators; batches are written while they are still crawling
+        await run_pipeline(crawler_func(), write_batch)
+        if not stats.events:
+            LOGGER.warning(f"No events returned from {spec.name}")
+            status = "empty"
+            return True
+        with stage("persist"):
+            # Only a complete crawl can tell which events the source no longer lists
+            if stats.quarantined or stats.dropped:
+                LOGGER.warning(f"⚠️ Skipping stale sweep for {spec.name}: {stats.quarantined} rows quarantined, "
+                               f"{stats.dropped} entries dropped")
+            elif seen_until is not None:  # undated events are never swept
+                for source_name in source_names:
+                    stats.swept += await sweep_stale_events(source_name, run_id, started_at, seen_until)
+            await refresh_event_stats(source_names)
+        LOGGER.info(f"Saved {stats.events} events from {spec.name}")
+        return True
     except Exception as e:
-        LOGGER.error(f"❌ Error running {crawler_func.__name__}: {e}")
+        LOGGER.error(f"❌ Error running {spec.name}: {e}")
+        status = "failed"
+        stats.error_class = type(e).__name__
+        stats.error_message = str(e)[:500]
+        if source_names:
+            # Batches written before the failure stay; keep the summary table in line with them
+            try:
+                await refresh_event_stats(source_names)
+            except Exception as e:
+                LOGGER.error(f"❌ Failed to refresh stats for {spec.name}: {e}")
+        return False
+    finally:
+        CURRENT_STATS.reset(token)
+        ARCHIVE.flush()
+        stats.rss_end_kb = current_rss_kb()
+        try:
+            await record_crawl_source(run_id, stats, started_at, status)
+        except Exception as e:
+            LOGGER.error(f"❌ Failed to record crawl ledger for {spec.name}: {e}")
 
-async def main():
-    for crawler in CRAWLERS:
-        await run_crawler(crawler)
+async def due_crawlers(specs: list[CrawlerSpec]) -> list[CrawlerSpec]:
+    """Keep the crawlers whose last successful run is older than their schedule."""
+    last_runs = await last_successful_crawls()
+    now = datetime.now()
+    return [spec for spec in specs if spec.name not in last_runs or now - last_runs[spec.name] >= spec.schedule]
 
-async def run_with_timeout(timeout_minutes: int = 30):
-    """Run main with a timeout; restart script if timeout is reached."""
-    while True:
+async def main(args):
+    specs = select_crawlers(args.source, args.kind)
+    if args.due:
+        specs = await due_crawlers(specs)
+    if not specs:
+        LOGGER.info("Nothing to crawl")
+        return
+
+    if REPLAY_MODE != "off":
+        LOGGER.info(f"🎞️ Crawl replay mode: {REPLAY_MODE}")
+    LOGGER.info(f"Crawling {', '.join(spec.name for spec in specs)}")
+    started = time.perf_counter()
+    await maintain_partitions()
+    run_id = await start_crawl_run()
+    results = [await run_crawler(spec, run_id) for spec in specs]
+    await finish_crawl_run(run_id, "success" if all(results) else "failed", peak_rss_kb())
+    if args.enrich:
+        # Imported lazily: only enrichment runs need the extraction helpers
+        from crawler.enrichment import enrich_run
+        try:
+            await enrich_run(run_id)
+        except Exception as e:
+            LOGGER.error(f"❌ Enrichment failed for run #{run_id}: {e}")
+    if SNAPSHOT_PUBLISH_PATH:
         try:
-            await asyncio.wait_for(main(), timeout=timeout_minutes * 60)
-            break  # finished successfully
-        except asyncio.TimeoutError:
-            LOGGER.warning(f"⚠️ Crawlers took more than {timeout_minutes} minutes. Restarting...")
-            # Option 1: restart program in-place
-            python = sys.executable
-            LOGGER.info("Restarting script from scratch...")
-            # Note: This replaces the current process with a new one
-            os.execv(python, [python] + sys.argv)
+            await publish_snapshot()
+        except Exception as e:
+            LOGGER.error(f"❌ Failed to publish snapshot {SNAPSHOT_PUBLISH_PATH}: {e}")
+    LOGGER.info(f"⏱️ All crawlers finished in {time.perf_counter() - started:.1f}s (run #{run_id})")
+
+async def run_with_timeout(args, timeout_minutes: int = 30):
+    """Run main with a timeout; restart script if timeout is reached."""
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(main(args), timeout=timeout_minutes * 60)
+                break  # finished successfully
+            except asyncio.TimeoutError:
+                LOGGER.warning(f"⚠️ Crawlers took more than {timeout_minutes} minutes. Restarting...")
+                # Option 1: restart program in-place
+                python = sys.executable
+                LOGGER.info("Restarting script from scratch...")
+                # Note: This replaces the current process with a new one
+                os.execv(python, [python] + sys.argv)
+    finally:
+        # aiosqlite's connection threads would otherwise keep the process alive, even after an error
+        await engine.dispose()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl music event sources into the database.")
+    parser.add_argument("--source", "-s", action="append",
+                        help="source to crawl, e.g. clubber.gr (repeatable or comma-separated; default: all)")
+    parser.add_argument("--kind", choices=["browser", "http"], help="only crawl sources of this kind")
+    parser.add_argument("--due", action="store_true", help="skip sources crawled successfully within their schedule")
+    parser.add_argument("--enrich", action=argparse.BooleanOptionalAction,
+                        default=os.getenv("CRAWL_ENRICH", "off").lower() in ("1", "on", "true"),
+                        help="visit event detail pages for times, images, prices and genres (env: CRAWL_ENRICH)")
+    parser.add_argument("--list", action="store_true", help="list the registered sources and exit")
+    parser.add_argument("--timeout", type=int, default=30, help="minutes before the run is restarted")
+    args = parser.parse_args(argv)
+    if args.source:
+        args.source = [name.strip() for value in args.source for name in value.split(",") if name.strip()]
+    return args
 
 if __name__ == "__main__":
-    asyncio.run(run_with_timeout())
+    args = parse_args()
+    if args.list:
+        for spec in CRAWLERS:
+            print(f"{spec.name:<24} {spec.kind:<8} every {spec.schedule}")
+        sys.exit(0)
+    try:
+        select_crawlers(args.source, args.kind)
+    except ValueError as e:
+        sys.exit(str(e))
+    asyncio.run(run_with_timeout(args, args.timeout))
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 import json
 
 
@@ -15,3 +15,16 @@ def serialize(obj):
     if isinstance(obj, datetime):
         return obj.isoformat()
     raise TypeError(f"Type {type(obj)} not serializable")
+
+def nearest_year(month: int, day: int, reference: date) -> int:
+    """
+    Year for a year-less "dd/mm" date: the one closest to `reference`, so
+    "03/01" seen in late December resolves to next year (and vice versa).
+    """
+    candidates = []
+    for year in (reference.year - 1, reference.year, reference.year + 1):
+        try:
+            candidates.append(date(year, month, day))
+        except ValueError:  # 29/02 outside leap years
+            continue
+    return min(candidates, key=lambda d: abs(d - reference)).year
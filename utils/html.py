@@ -0,0 +1,89 @@
+"""
+lxml based HTML helpers for the crawlers.
+
+Building a BeautifulSoup tree with html.parser for every event was the bulk
+of normalization time; lxml parses in C, fragments are parsed in one batch,
+and tag stripping skips the parser entirely for plain text. Whole pages can
+be parsed in a worker process with run_in_process().
+"""
+import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from lxml import html as lxml_html
+from lxml.etree import ParserError
+
+# 0 parses pages inline in the event loop's process
+HTML_WORKERS = int(os.getenv("HTML_PARSE_WORKERS", "2"))
+
+FRAGMENT_TAG = "x-fragment"
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def parse_document(markup: str):
+    """Parse a full page; empty input yields an empty <div> instead of raising."""
+    try:
+        return lxml_html.document_fromstring(markup)
+    except ParserError:
+        return lxml_html.fragment_fromstring("", create_parent="div")
+
+
+def parse_fragment(markup: str):
+    """Parse an HTML snippet into a <div> wrapping its nodes."""
+    return lxml_html.fragment_fromstring(markup or "", create_parent="div")
+
+
+def parse_fragments(fragments: list[str]) -> list:
+    """
+    Parse many snippets with a single parser call. Each snippet comes back as
+    its own wrapper element; if one is malformed enough to swallow its
+    neighbours, fall back to parsing them one by one.
+    """
+    wrapped = "".join(f"<{FRAGMENT_TAG}>{fragment or ''}</{FRAGMENT_TAG}>" for fragment in fragments)
+    root = parse_fragment(wrapped)
+    roots = [child for child in root if child.tag == FRAGMENT_TAG]
+    if len(roots) == len(fragments) and len(root.findall(f".//{FRAGMENT_TAG}")) == len(fragments):
+        return roots
+    return [parse_fragment(fragment) for fragment in fragments]
+
+
+def text_content(element, separator: str = "", strip: bool = True) -> str:
+    """Equivalent of BeautifulSoup's get_text(separator, strip)."""
+    if element is None:
+        return ""
+    parts = element.itertext()
+    if strip:
+        return separator.join(part.strip() for part in parts if part.strip())
+    return separator.join(parts)
+
+
+def strip_tags(markup: str | None, separator: str = " ") -> str:
+    """Plain text of an HTML snippet, e.g. "A<br>B" -> "A B"."""
+    if not markup:
+        return ""
+    # Fast path: nothing to parse
+    if "<" not in markup and "&" not in markup:
+        return markup.strip()
+    return text_content(parse_fragment(markup), separator)
+
+
+def has_class(element, name: str) -> bool:
+    return name in (element.get("class") or "").split()
+
+
+def process_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=HTML_WORKERS)
+    return _pool
+
+
+async def run_in_process(func, *args):
+    """
+    Run a CPU heavy parse (a module level function returning picklable data)
+    in the worker pool so it doesn't block the event loop.
+    """
+    if HTML_WORKERS <= 0:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(process_pool(), func, *args)
@@ -0,0 +1,93 @@
+from datetime import datetime, timezone
+
+PRODID = "-//aggeor//music-events-aggregator//EN"
+TZID = "Europe/Athens"
+
+# Crawled times are naive Athens wall-clock times
+VTIMEZONE = "\r\n".join([
+    "BEGIN:VTIMEZONE",
+    f"TZID:{TZID}",
+    "BEGIN:DAYLIGHT",
+    "TZOFFSETFROM:+0200",
+    "TZOFFSETTO:+0300",
+    "TZNAME:EEST",
+    "DTSTART:19700329T030000",
+    "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU",
+    "END:DAYLIGHT",
+    "BEGIN:STANDARD",
+    "TZOFFSETFROM:+0300",
+    "TZOFFSETTO:+0200",
+    "TZNAME:EET",
+    "DTSTART:19701025T040000",
+    "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU",
+    "END:STANDARD",
+    "END:VTIMEZONE",
+]) + "\r\n"
+
+
+def escape_text(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def fold_line(line: str) -> str:
+    """Fold a content line at 75 octets as required by RFC 5545."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts, current, size = [], "", 0
+    for char in line:
+        width = len(char.encode("utf-8"))
+        # Continuation lines start with a space, which counts towards the limit
+        if size + width > (75 if not parts else 74):
+            parts.append(current)
+            current, size = "", 0
+        current += char
+        size += width
+    parts.append(current)
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def format_local(dt: datetime) -> str:
+    return dt.strftime("%Y%m%dT%H%M%S")
+
+
+def calendar_header(name: str = "Music events") -> str:
+    return (
+        "BEGIN:VCALENDAR\r\n"
+        "VERSION:2.0\r\n"
+        f"PRODID:{PRODID}\r\n"
+        "CALSCALE:GREGORIAN\r\n"
+        "METHOD:PUBLISH\r\n"
+        + fold_line(f"X-WR-CALNAME:{escape_text(name)}")
+        + f"X-WR-TIMEZONE:{TZID}\r\n"
+        + VTIMEZONE
+    )
+
+
+def calendar_footer() -> str:
+    return "END:VCALENDAR\r\n"
+
+
+def render_vevent(event, dtstamp: datetime | None = None) -> str:
+    """Render a music_events row as a VEVENT; events without a start_date are skipped."""
+    if event.start_date is None:
+        return ""
+    dtstamp = dtstamp or datetime.now(timezone.utc)
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:event-{event.id}@music-events-aggregator",
+        f"DTSTAMP:{dtstamp.strftime('%Y%m%dT%H%M%SZ')}",
+        f"DTSTART;TZID={TZID}:{format_local(event.start_date)}",
+    ]
+    if event.end_date and event.end_date > event.start_date:
+        lines.append(f"DTEND;TZID={TZID}:{format_local(event.end_date)}")
+    lines.append(f"SUMMARY:{escape_text(event.title or '')}")
+    if event.location:
+        lines.append(f"LOCATION:{escape_text(event.location)}")
+    if event.detailsUrl:
+        lines.append(f"URL:{event.detailsUrl}")
+    if event.sourceName:
+        lines.append(f"DESCRIPTION:{escape_text(f'Source: {event.sourceName}')}")
+    lines.append("END:VEVENT")
+    return "".join(fold_line(line) for line in lines)
@@ -0,0 +1,72 @@
+import time
+import resource
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+STAGES = ("fetch", "extract", "normalize", "persist")
+
+
+@dataclass
+class SourceStats:
+    """Per-source counters for one crawl run, persisted to crawl_run_sources."""
+    source: str
+    timings: dict = field(default_factory=lambda: dict.fromkeys(STAGES, 0.0))
+    pages: int = 0
+    events: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    quarantined: int = 0
+    dropped: int = 0  # listed entries the crawler couldn't turn into events
+    swept: int = 0
+    error_class: str | None = None
+    error_message: str | None = None
+    # Current RSS when the source started and finished. ru_maxrss is process-wide
+    # and never goes down, so a per-source peak would repeat the heaviest source's.
+    rss_start_kb: int | None = None
+    rss_end_kb: int | None = None
+
+
+# Stats of the source currently being crawled; unset outside of run_crawler
+CURRENT_STATS: ContextVar[SourceStats | None] = ContextVar("current_stats", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Add the wall time spent inside the block to the current source's stage timing."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = CURRENT_STATS.get()
+        if stats is not None:
+            stats.timings[name] += time.perf_counter() - started
+
+
+def count_page(n: int = 1):
+    stats = CURRENT_STATS.get()
+    if stats is not None:
+        stats.pages += n
+
+
+def count_dropped(n: int = 1):
+    """Count listing entries skipped as unparseable; a run with drops is not complete."""
+    stats = CURRENT_STATS.get()
+    if stats is not None:
+        stats.dropped += n
+
+
+def peak_rss_kb() -> int:
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def current_rss_kb() -> int:
+    """Resident set size of this process right now (Linux /proc), else the peak so far."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return peak_rss_kb()
+    return pages * resource.getpagesize() // 1024
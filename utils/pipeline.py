@@ -0,0 +1,80 @@
+"""
+Streams events from a crawler (an async generator) to the database.
+
+The crawler runs as a producer task feeding a bounded queue, so a slow
+writer applies backpressure instead of letting events pile up in memory.
+The writer flushes a batch once it holds BATCH_SIZE events or its oldest
+event has waited FLUSH_SECONDS, so multi-page sources land in the DB
+while later pages are still loading.
+"""
+import os
+import asyncio
+
+BATCH_SIZE = int(os.getenv("PIPELINE_BATCH_SIZE", "200"))
+FLUSH_SECONDS = float(os.getenv("PIPELINE_FLUSH_SECONDS", "5"))
+QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "1000"))
+
+_DONE = object()
+
+
+class _CrawlerFailed:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+async def run_pipeline(events, write_batch, batch_size: int = BATCH_SIZE,
+                       flush_seconds: float = FLUSH_SECONDS, queue_size: int = QUEUE_SIZE) -> int:
+    """
+    Drain the `events` async iterator into `await write_batch(batch)`.
+    Returns the number of events written. A crawler error is re-raised after
+    the events yielded before it have been written; a writer error cancels
+    the crawler.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    loop = asyncio.get_running_loop()
+
+    async def produce():
+        try:
+            async for event in events:
+                await queue.put(event)
+        except Exception as e:
+            await queue.put(_CrawlerFailed(e))
+            return
+        await queue.put(_DONE)
+
+    async def consume() -> int:
+        batch, written, deadline = [], 0, None
+        while True:
+            timeout = None if not batch else max(0.0, deadline - loop.time())
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                item = None  # oldest event waited long enough
+
+            if item is _DONE or isinstance(item, _CrawlerFailed):
+                if batch:
+                    await write_batch(batch)
+                    written += len(batch)
+                if isinstance(item, _CrawlerFailed):
+                    raise item.error
+                return written
+
+            if item is not None:
+                if not batch:
+                    deadline = loop.time() + flush_seconds
+                batch.append(item)
+            if batch and (item is None or len(batch) >= batch_size):
+                await write_batch(batch)
+                written += len(batch)
+                batch = []
+
+    producer = asyncio.create_task(produce())
+    try:
+        return await consume()
+    finally:
+        if not producer.done():
+            producer.cancel()
+        try:
+            await producer
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,115 @@
+import sys
+import hashlib
+from dataclasses import dataclass, fields
+from datetime import datetime, time
+
+from utils.helper import LOGGER
+from utils.metrics import count_dropped
+
+
+# Start time crawlers use when a listing gives only a date; enrichment may replace it
+PLACEHOLDER_TIME = time(21, 0)
+
+
+class InvalidEventError(ValueError):
+    """A crawled event that can't be stored as a music_events row."""
+
+
+@dataclass(frozen=True, slots=True)
+class EventRecord:
+    """
+    One crawled event, as every crawler yields it and save_events_to_db stores
+    it. Validated on construction so a bad row is dropped at the crawler
+    instead of failing the whole batch's commit. start_date may be None for
+    listings without a usable date (clubber.gr entries without a time,
+    undated ticketservices rows); those are stored with a NULL start_date.
+    sourceName / sourceUrl are interned: every event of a source shares the
+    same two strings.
+    """
+    title: str
+    start_date: datetime | None
+    end_date: datetime | None
+    location: str | None
+    imageUrl: str | None
+    detailsUrl: str | None
+    sourceName: str
+    sourceUrl: str
+
+    def __post_init__(self):
+        if not isinstance(self.title, str) or not self.title.strip():
+            raise InvalidEventError("missing title")
+        if self.start_date is not None and not isinstance(self.start_date, datetime):
+            raise InvalidEventError(f"start_date is not a datetime: {self.start_date!r}")
+        if self.end_date is not None:
+            if not isinstance(self.end_date, datetime):
+                raise InvalidEventError(f"end_date is not a datetime: {self.end_date!r}")
+            if self.start_date is not None and self.end_date < self.start_date:
+                raise InvalidEventError(f"end_date {self.end_date} is before start_date {self.start_date}")
+        for name in ("location", "imageUrl", "detailsUrl"):
+            value = getattr(self, name)
+            if value is not None and not isinstance(value, str):
+                raise InvalidEventError(f"{name} is not a string: {value!r}")
+        for name in ("sourceName", "sourceUrl"):
+            value = getattr(self, name)
+            if not isinstance(value, str) or not value:
+                raise InvalidEventError(f"missing {name}")
+            object.__setattr__(self, name, sys.intern(value))
+        object.__setattr__(self, "title", self.title.strip())
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "EventRecord":
+        unknown = set(data).difference(FIELD_NAMES)
+        if unknown:
+            raise InvalidEventError(f"unknown fields: {', '.join(sorted(unknown))}")
+        try:
+            return cls(**data)
+        except TypeError as e:  # missing fields
+            raise InvalidEventError(str(e)) from e
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in FIELD_NAMES}
+
+    def listing_hash(self) -> str:
+        """Fingerprint of the listing entry; detail pages are re-fetched when it changes."""
+        return hashlib.sha1(repr(tuple(getattr(self, name) for name in FIELD_NAMES)).encode()).hexdigest()
+
+
+FIELD_NAMES = tuple(f.name for f in fields(EventRecord))
+
+
+def make_record(**data) -> EventRecord | None:
+    """Build an EventRecord, or log, count as dropped and return None for an invalid event."""
+    try:
+        return EventRecord.from_dict(data)
+    except InvalidEventError as e:
+        count_dropped()
+        LOGGER.warning(f"⚠️ Skipping invalid event from {data.get('sourceName')} "
+                       f"({data.get('title') or data.get('detailsUrl')}): {e}")
+        return None
+
+
+def apply_enrichment(row: dict, data: dict) -> dict:
+    """
+    Merge fields scraped from an event's detail page (see crawler/enrichment.py)
+    into a music_events row built from the listing. Listing values win except
+    where the listing has nothing or only a placeholder time.
+    """
+    row = dict(row)
+    if data.get("imageUrl") and not row.get("imageUrl"):
+        row["imageUrl"] = data["imageUrl"]
+    start, end = row.get("start_date"), row.get("end_date")
+    # Crawlers put both ends of a date-only listing on the placeholder time
+    placeholder = start is not None and start.time() == PLACEHOLDER_TIME and (
+        end is None or end.time() == PLACEHOLDER_TIME)
+    if data.get("start_date") and placeholder:
+        exact = datetime.fromisoformat(data["start_date"])
+        # Only the time of day: multi-day listings share one detail page
+        if exact.date() == start.date():
+            row["start_date"] = exact
+            if end is not None:
+                # Keep the listed duration, so the end never lands before the start
+                row["end_date"] = end + (exact - start)
+    for name in ("price", "genres"):
+        if data.get(name):
+            row[name] = data[name]
+    return row
@@ -0,0 +1,198 @@
+import os
+import gzip
+import asyncio
+import json
+import time
+import atexit
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+from utils.helper import LOGGER
+from utils.metrics import stage, count_page
+from utils.resilience import FetchError, FETCH_TIMEOUT_SECONDS, fetch_with_policy
+
+# off | record | replay
+REPLAY_MODE = os.getenv("CRAWL_REPLAY_MODE", "off").lower()
+ARCHIVE_DIR = os.getenv("CRAWL_ARCHIVE_DIR", "/data/archive")
+
+# crawl4ai result attributes the crawlers read
+CRAWL4AI_FIELDS = ("success", "status_code", "error_message", "extracted_content", "fit_html")
+
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode when the archive has no response for a request."""
+
+
+class Archive:
+    """
+    HAR-style archive of every response the crawlers see, one gzip file per host.
+
+    Entries are matched on (kind, url, occurrence) so a crawler that requests
+    the same URL twice (e.g. aptaliko's extraction + pagination passes) gets
+    its responses back in the original order.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.entries: dict[str, list[dict]] = {}
+        self.dirty: set[str] = set()
+        self.seen: dict[tuple[str, str], int] = {}
+
+    def _path(self, host: str) -> str:
+        return os.path.join(self.directory, f"{host}.har.json.gz")
+
+    def _load(self, host: str) -> list[dict]:
+        if host not in self.entries:
+            path = self._path(host)
+            if REPLAY_MODE == "replay" and os.path.exists(path):
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    self.entries[host] = json.load(f)["log"]["entries"]
+            else:
+                # Recording always starts a fresh archive for the host
+                self.entries[host] = []
+        return self.entries[host]
+
+    def _next_index(self, kind: str, url: str) -> int:
+        index = self.seen.get((kind, url), 0)
+        self.seen[(kind, url)] = index + 1
+        return index
+
+    def record(self, kind: str, url: str, content, elapsed: float):
+        host = urlparse(url).netloc
+        self._load(host).append({
+            "startedDateTime": datetime.now(timezone.utc).isoformat(),
+            "time": round(elapsed * 1000, 1),
+            "request": {"method": "GET", "url": url, "kind": kind, "index": self._next_index(kind, url)},
+            "response": {"content": content},
+        })
+        self.dirty.add(host)
+
+    def replay(self, kind: str, url: str):
+        index = self._next_index(kind, url)
+        for entry in self._load(urlparse(url).netloc):
+            request = entry["request"]
+            if request["kind"] == kind and request["url"] == url and request["index"] == index:
+                return entry["response"]["content"]
+        raise ReplayMissError(f"No archived {kind} response #{index} for {url}")
+
+    def flush(self):
+        if not self.dirty:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for host in sorted(self.dirty):
+            with gzip.open(self._path(host), "wt", encoding="utf-8") as f:
+                json.dump({"log": {"version": "1.2", "creator": {"name": "music-events-aggregator"},
+                                   "entries": self.entries[host]}}, f, ensure_ascii=False)
+            LOGGER.info(f"💾 Archived {len(self.entries[host])} responses for {host}")
+        self.dirty.clear()
+
+
+ARCHIVE = Archive(ARCHIVE_DIR)
+atexit.register(ARCHIVE.flush)
+
+
+def crawl_failure(result):
+    return None if result.success else (result.error_message or "crawl failed")
+
+
+def http_failure(res):
+    # Server errors and throttling are worth retrying; other statuses are the caller's call
+    return f"HTTP {res.status_code}" if res.status_code >= 500 or res.status_code == 429 else None
+
+
+class TransportCrawler:
+    """
+    Wraps an AsyncWebCrawler (or nothing, in replay mode) so every arun()
+    is timed as a fetch, goes through the retry / rate limit policy and is
+    recorded / replayed according to CRAWL_REPLAY_MODE. Raises FetchError
+    instead of returning an unsuccessful result.
+    """
+
+    def __init__(self, crawler=None):
+        self.crawler = crawler
+
+    async def arun(self, url: str, config=None, **kwargs):
+        count_page()
+        with stage("fetch"):
+            if REPLAY_MODE == "replay":
+                result = SimpleNamespace(**ARCHIVE.replay("crawl4ai", url))
+                if not result.success:
+                    raise FetchError(f"Giving up on {url}: {crawl_failure(result)}")
+                return result
+
+            started = time.perf_counter()
+            result = await fetch_with_policy(
+                url, lambda: self.crawler.arun(url=url, config=config, **kwargs), crawl_failure
+            )
+            if REPLAY_MODE == "record":
+                content = {field: getattr(result, field, None) for field in CRAWL4AI_FIELDS}
+                ARCHIVE.record("crawl4ai", url, content, time.perf_counter() - started)
+            return result
+
+
+@asynccontextmanager
+async def open_crawler(**kwargs):
+    """Drop-in for `async with AsyncWebCrawler(...)` honouring CRAWL_REPLAY_MODE."""
+    if REPLAY_MODE == "replay":
+        yield TransportCrawler()
+        return
+
+    from crawl4ai import AsyncWebCrawler
+
+    async with AsyncWebCrawler(**kwargs) as crawler:
+        yield TransportCrawler(crawler)
+
+
+class ReplayResponse:
+    """Minimal requests.Response look-alike for archived HTTP fetches."""
+
+    def __init__(self, url: str, status_code: int, text: str):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+async def http_get(url: str, **kwargs):
+    """
+    requests.get() run in a worker thread under the retry / rate limit policy,
+    recorded / replayed according to CRAWL_REPLAY_MODE.
+    """
+    count_page()
+    with stage("fetch"):
+        if REPLAY_MODE == "replay":
+            content = ARCHIVE.replay("http", url)
+            return ReplayResponse(url, content["status_code"], content["text"])
+
+        import requests
+
+        started = time.perf_counter()
+        res = await fetch_with_policy(url, lambda: asyncio.to_thread(requests.get, url, **kwargs), http_failure)
+        if REPLAY_MODE == "record":
+            ARCHIVE.record("http", url, {"status_code": res.status_code, "text": res.text},
+                           time.perf_counter() - started)
+        return res
+
+
+async def capture(kind: str, url: str, producer, timeout: float | None = FETCH_TIMEOUT_SECONDS):
+    """
+    Record / replay the JSON-serialisable output of an arbitrary async fetch,
+    e.g. the raw fields a Playwright page yields. `producer` is retried under
+    the shared policy; in replay mode it is never called.
+    """
+    count_page()
+    with stage("fetch"):
+        if REPLAY_MODE == "replay":
+            return ARCHIVE.replay(kind, url)
+
+        started = time.perf_counter()
+        content = await fetch_with_policy(url, producer, timeout=timeout)
+        if REPLAY_MODE == "record":
+            ARCHIVE.record(kind, url, content, time.perf_counter() - started)
+        return content
@@ -0,0 +1,147 @@
+"""
+Retry / rate limit / circuit breaker policy shared by every crawler fetch.
+
+All fetches go through utils/replay.py, which calls fetch_with_policy():
+  - a per-host token bucket spaces out requests to the same site,
+  - failed attempts are retried with exponential backoff and jitter,
+  - after BREAKER_THRESHOLD consecutive failed attempts a source's breaker
+    opens and every further fetch for it fails fast (CircuitOpenError)
+    for the rest of the run,
+  - a timeout is not retried and opens the breaker at once: a host that
+    stops answering would otherwise cost RETRY_ATTEMPTS full timeouts.
+"""
+import os
+import time
+import random
+import asyncio
+from urllib.parse import urlparse
+
+from utils.helper import LOGGER
+from utils.metrics import CURRENT_STATS
+
+RETRY_ATTEMPTS = int(os.getenv("CRAWL_RETRY_ATTEMPTS", "3"))
+BACKOFF_BASE_SECONDS = float(os.getenv("CRAWL_BACKOFF_BASE_SECONDS", "1"))
+BACKOFF_MAX_SECONDS = float(os.getenv("CRAWL_BACKOFF_MAX_SECONDS", "20"))
+FETCH_TIMEOUT_SECONDS = float(os.getenv("CRAWL_FETCH_TIMEOUT_SECONDS", "90"))
+HOST_RATE_PER_SECOND = float(os.getenv("CRAWL_HOST_RATE", "2"))
+HOST_BURST = int(os.getenv("CRAWL_HOST_BURST", "4"))
+BREAKER_THRESHOLD = int(os.getenv("CRAWL_BREAKER_THRESHOLD", "3"))
+
+
+class FetchError(RuntimeError):
+    """A fetch kept failing after every retry."""
+
+
+class CircuitOpenError(FetchError):
+    """The source failed repeatedly in this run and is being skipped."""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, threshold: int):
+        self.name = name
+        self.threshold = threshold
+        self.failures = 0
+
+    @property
+    def open(self) -> bool:
+        return self.failures >= self.threshold
+
+    def check(self):
+        if self.open:
+            raise CircuitOpenError(f"{self.name}: circuit open after {self.failures} consecutive failures")
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures == self.threshold:
+            LOGGER.error(f"⛔ {self.name}: circuit opened, skipping further fetches this run")
+
+    def trip(self):
+        """Open the breaker now, whatever the failure count."""
+        if not self.open:
+            self.failures = self.threshold - 1
+            self.record_failure()
+
+
+BUCKETS: dict[str, TokenBucket] = {}
+BREAKERS: dict[str, CircuitBreaker] = {}
+
+
+def bucket_for(url: str) -> TokenBucket:
+    host = urlparse(url).netloc
+    if host not in BUCKETS:
+        BUCKETS[host] = TokenBucket(HOST_RATE_PER_SECOND, HOST_BURST)
+    return BUCKETS[host]
+
+
+def breaker_for(url: str) -> CircuitBreaker:
+    """One breaker per source being crawled (per host outside of run_crawler)."""
+    stats = CURRENT_STATS.get()
+    name = stats.source if stats is not None else urlparse(url).netloc
+    if name not in BREAKERS:
+        BREAKERS[name] = CircuitBreaker(name, BREAKER_THRESHOLD)
+    return BREAKERS[name]
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with "equal jitter": half fixed, half random."""
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+async def fetch_with_policy(url: str, fetch, failure=None, timeout: float | None = FETCH_TIMEOUT_SECONDS):
+    """
+    Await `fetch()` under the shared policy. `failure(result)` may return an
+    error message for results that didn't raise but still count as failed
+    (e.g. crawl4ai's success=False); those are retried too. A timeout is
+    not: it opens the source's breaker and gives up straight away.
+    Raises FetchError once the attempts are exhausted, CircuitOpenError when
+    the source's breaker is open.
+    """
+    breaker = breaker_for(url)
+    breaker.check()
+    error = None
+    for attempt in range(1, RETRY_ATTEMPTS + 1):
+        await bucket_for(url).acquire()
+        try:
+            result = await asyncio.wait_for(fetch(), timeout)
+            error = failure(result) if failure else None
+        except asyncio.TimeoutError:
+            LOGGER.warning(f"⚠️ Fetch {attempt}/{RETRY_ATTEMPTS} timed out for {url} after {timeout:.0f}s")
+            breaker.trip()
+            raise FetchError(f"Giving up on {url}: timed out after {timeout:.0f}s")
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        if error is None:
+            breaker.record_success()
+            return result
+
+        breaker.record_failure()
+        LOGGER.warning(f"⚠️ Fetch {attempt}/{RETRY_ATTEMPTS} failed for {url}: {error}")
+        if attempt == RETRY_ATTEMPTS or breaker.open:
+            break
+        await asyncio.sleep(backoff_delay(attempt))
+
+    raise FetchError(f"Giving up on {url}: {error}")
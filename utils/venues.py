@@ -0,0 +1,39 @@
+import re
+import unicodedata
+
+SEGMENT_SPLIT_RE = re.compile(r"\s*[-–—,|/]\s*")
+NON_WORD_RE = re.compile(r"[^\w\s]")
+SPACES_RE = re.compile(r"\s+")
+
+
+def strip_accents(value: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", value) if unicodedata.category(c) != "Mn")
+
+
+# Trailing " - Αθήνα" style segments that sources append to the venue name,
+# folded like venue_key folds its input (casefold turns a final "ς" into "σ")
+CITY_SEGMENTS = {
+    strip_accents(name).casefold()
+    for name in ("Αθήνα", "Athens", "Athina", "Θεσσαλονίκη", "Thessaloniki",
+                 "Πειραιάς", "Piraeus", "Greece", "Ελλάδα")
+}
+
+
+def venue_key(location: str | None) -> str | None:
+    """
+    Normalized lookup key for a free-text venue string, so spellings such as
+    "Gazarte" and "GAZARTE - Αθήνα" intern to the same key ("gazarte").
+    """
+    if not location:
+        return None
+    value = strip_accents(location).casefold().strip()
+    segments = [s for s in SEGMENT_SPLIT_RE.split(value) if s]
+    while len(segments) > 1 and segments[-1] in CITY_SEGMENTS:
+        segments.pop()
+    value = NON_WORD_RE.sub(" ", " ".join(segments))
+    value = SPACES_RE.sub(" ", value).strip()
+    return value or None
+
+
+def display_name(location: str) -> str:
+    return SPACES_RE.sub(" ", location).strip()